@@ -153,6 +153,12 @@ async def main():
             logger.info("🛑 Stopping bot...")
             await bot.stop()
             logger.info("✅ Bot stopped successfully")
+        
+        # Stop indexing, then flush buffered download counters and analytics before exiting
+        from handlers.indexer import stop_indexing
+        from database.models import db
+        stop_indexing()
+        await db.close()
             
         # Stop the web server
         if 'web_runner' in locals():
@@ -18,6 +18,12 @@ class Config:
     # MongoDB URI
     MONGO_DB_URI: str = os.environ.get("MONGO_DB_URI", "")
     
+    # MongoDB connection pool, shared by every handler worker (wait timeout 0 waits forever)
+    MONGO_MAX_POOL_SIZE: int = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE: int = int(os.environ.get("MONGO_MIN_POOL_SIZE", 10))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+    MONGO_READ_PREFERENCE: str = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+    
     # Channel IDs (as integers)
     LOG_CHANNEL_ID: int = int(os.environ.get("LOG_CHANNEL_ID", 0))
     FILES_CHANNEL_ID: int = int(os.environ.get("FILES_CHANNEL_ID", 0))
@@ -34,6 +40,104 @@ class Config:
     # Auto index files on startup
     AUTO_INDEX: bool = os.environ.get("AUTO_INDEX", "False").lower() == "true"
     
+    # Channels to index (comma-separated), defaults to the files channel
+    INDEX_CHANNEL_IDS: List[int] = [
+        int(chat_id) for chat_id in os.environ.get("INDEX_CHANNEL_IDS", "").split(",") if chat_id
+    ] or ([FILES_CHANNEL_ID] if FILES_CHANNEL_ID else [])
+    
+    # Indexing pipeline: media extraction workers, bulk writers and bounded queue size (in blocks)
+    INDEX_EXTRACT_WORKERS: int = int(os.environ.get("INDEX_EXTRACT_WORKERS", 2))
+    INDEX_WRITE_WORKERS: int = int(os.environ.get("INDEX_WRITE_WORKERS", 2))
+    INDEX_QUEUE_SIZE: int = int(os.environ.get("INDEX_QUEUE_SIZE", 10))
+    
+    # Files per bulk write and empty 200-message blocks that end a history walk
+    INDEX_BULK_SIZE: int = int(os.environ.get("INDEX_BULK_SIZE", 1000))
+    INDEX_EMPTY_BATCH_LIMIT: int = int(os.environ.get("INDEX_EMPTY_BATCH_LIMIT", 5))
+    # Minimum seconds between edits of the indexing progress message
+    INDEX_PROGRESS_INTERVAL: int = int(os.environ.get("INDEX_PROGRESS_INTERVAL", 10))
+    
+    # Serve searches from an in-memory inverted index built at startup
+    IN_MEMORY_INDEX: bool = os.environ.get("IN_MEMORY_INDEX", "False").lower() == "true"
+    # Answer inline prefix queries from an in-memory autocomplete index
+    AUTOCOMPLETE_INDEX: bool = os.environ.get("AUTOCOMPLETE_INDEX", "False").lower() == "true"
+    # Retry searches without results using typo-corrected tokens (max edit distance 1-2)
+    FUZZY_SEARCH: bool = os.environ.get("FUZZY_SEARCH", "False").lower() == "true"
+    FUZZY_MAX_DISTANCE: int = int(os.environ.get("FUZZY_MAX_DISTANCE", 2))
+    INDEX_LOAD_BATCH_SIZE: int = int(os.environ.get("INDEX_LOAD_BATCH_SIZE", 5000))
+    
+    # Seconds between search plan (index metadata) refreshes, 0 to disable
+    SEARCH_PLAN_REFRESH_INTERVAL: int = int(os.environ.get("SEARCH_PLAN_REFRESH_INTERVAL", 3600))
+    
+    # Ranking: text relevance is blended with a precomputed popularity score
+    # built from downloads and recency (half-life in days), refreshed every N seconds
+    RANK_TEXT_WEIGHT: float = float(os.environ.get("RANK_TEXT_WEIGHT", 1.0))
+    RANK_DOWNLOADS_WEIGHT: float = float(os.environ.get("RANK_DOWNLOADS_WEIGHT", 0.3))
+    RANK_RECENCY_WEIGHT: float = float(os.environ.get("RANK_RECENCY_WEIGHT", 0.1))
+    RANK_RECENCY_HALF_LIFE_DAYS: float = float(os.environ.get("RANK_RECENCY_HALF_LIFE_DAYS", 30))
+    POPULARITY_REFRESH_INTERVAL: int = int(os.environ.get("POPULARITY_REFRESH_INTERVAL", 3600))
+    # Smallest popularity change written back by a refresh, smaller drifts are skipped
+    POPULARITY_MIN_CHANGE: float = float(os.environ.get("POPULARITY_MIN_CHANGE", 0.001))
+    
+    # Search result cache (entries, seconds), size 0 disables it
+    SEARCH_CACHE_SIZE: int = int(os.environ.get("SEARCH_CACHE_SIZE", 5000))
+    SEARCH_CACHE_TTL: int = int(os.environ.get("SEARCH_CACHE_TTL", 300))
+    
+    # Metadata of recently listed files kept in memory for downloads (entries, seconds)
+    FILE_CACHE_SIZE: int = int(os.environ.get("FILE_CACHE_SIZE", 20000))
+    FILE_CACHE_TTL: int = int(os.environ.get("FILE_CACHE_TTL", 3600))
+    
+    # /search pagination: results per page and how long Prev/Next state is kept
+    SEARCH_PAGE_SIZE: int = int(os.environ.get("SEARCH_PAGE_SIZE", 10))
+    SEARCH_SESSION_CACHE_SIZE: int = int(os.environ.get("SEARCH_SESSION_CACHE_SIZE", 10000))
+    SEARCH_SESSION_TTL: int = int(os.environ.get("SEARCH_SESSION_TTL", 3600))
+    
+    # Milliseconds to wait for a newer inline query from the same user before searching
+    INLINE_DEBOUNCE_MS: int = int(os.environ.get("INLINE_DEBOUNCE_MS", 250))
+    
+    # Rendered inline results kept per file, and how long Telegram may cache each kind of answer (seconds)
+    INLINE_RENDER_CACHE_SIZE: int = int(os.environ.get("INLINE_RENDER_CACHE_SIZE", 20000))
+    INLINE_CACHE_TIME: int = int(os.environ.get("INLINE_CACHE_TIME", 300))
+    INLINE_PREFIX_CACHE_TIME: int = int(os.environ.get("INLINE_PREFIX_CACHE_TIME", 60))
+    INLINE_EMPTY_CACHE_TIME: int = int(os.environ.get("INLINE_EMPTY_CACHE_TIME", 30))
+    INLINE_HELP_CACHE_TIME: int = int(os.environ.get("INLINE_HELP_CACHE_TIME", 3600))
+    
+    # Download counters are buffered and written every N seconds or after M downloads
+    DOWNLOAD_FLUSH_INTERVAL: int = int(os.environ.get("DOWNLOAD_FLUSH_INTERVAL", 30))
+    DOWNLOAD_FLUSH_THRESHOLD: int = int(os.environ.get("DOWNLOAD_FLUSH_THRESHOLD", 500))
+    
+    # Known-user registry: recent profiles kept in memory
+    USER_CACHE_SIZE: int = int(os.environ.get("USER_CACHE_SIZE", 100000))
+    
+    # Token-bucket rate limits on /search, inline queries and file buttons (requests/second, burst).
+    # RATE_LIMIT_BACKEND "local" keeps buckets in memory, "mongo" shares them between processes
+    RATE_LIMIT_BACKEND: str = os.environ.get("RATE_LIMIT_BACKEND", "local")
+    RATE_LIMIT_USER_RATE: float = float(os.environ.get("RATE_LIMIT_USER_RATE", 0.5))
+    RATE_LIMIT_USER_BURST: int = int(os.environ.get("RATE_LIMIT_USER_BURST", 5))
+    RATE_LIMIT_INLINE_RATE: float = float(os.environ.get("RATE_LIMIT_INLINE_RATE", 2))
+    RATE_LIMIT_INLINE_BURST: int = int(os.environ.get("RATE_LIMIT_INLINE_BURST", 15))
+    RATE_LIMIT_CHAT_RATE: float = float(os.environ.get("RATE_LIMIT_CHAT_RATE", 2))
+    RATE_LIMIT_CHAT_BURST: int = int(os.environ.get("RATE_LIMIT_CHAT_BURST", 20))
+    # Seconds between reloads of the banned ids, so a /ban on one process reaches the others (0 disables)
+    BAN_RELOAD_INTERVAL: int = int(os.environ.get("BAN_RELOAD_INTERVAL", 60))
+    
+    # Outbound Telegram sends: global and per-chat messages per second, queue bound,
+    # longest FloodWait worth waiting out, and how long a file button waits before answering "queued"
+    SEND_GLOBAL_RATE: float = float(os.environ.get("SEND_GLOBAL_RATE", 25))
+    SEND_CHAT_RATE: float = float(os.environ.get("SEND_CHAT_RATE", 1))
+    SEND_QUEUE_SIZE: int = int(os.environ.get("SEND_QUEUE_SIZE", 10000))
+    SEND_MAX_FLOOD_WAIT: int = int(os.environ.get("SEND_MAX_FLOOD_WAIT", 300))
+    FILE_DELIVERY_WAIT: int = int(os.environ.get("FILE_DELIVERY_WAIT", 10))
+    
+    # Search/download analytics: rollup flush interval (seconds) and retention (days)
+    ANALYTICS_FLUSH_INTERVAL: int = int(os.environ.get("ANALYTICS_FLUSH_INTERVAL", 60))
+    ANALYTICS_MINUTE_RETENTION_DAYS: int = int(os.environ.get("ANALYTICS_MINUTE_RETENTION_DAYS", 2))
+    ANALYTICS_HOUR_RETENTION_DAYS: int = int(os.environ.get("ANALYTICS_HOUR_RETENTION_DAYS", 90))
+    
+    # /stats is served from memory: totals older than STATS_MAX_AGE seconds are re-read,
+    # the per-type breakdown is recounted every STATS_RECONCILE_INTERVAL seconds
+    STATS_MAX_AGE: int = int(os.environ.get("STATS_MAX_AGE", 300))
+    STATS_RECONCILE_INTERVAL: int = int(os.environ.get("STATS_RECONCILE_INTERVAL", 3600))
+    
     # Web server configuration
     PORT: int = int(os.environ.get("PORT", 8082))
     
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+
+# Rollup granularities and the width of their time buckets
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+}
+
+# Rollup kinds: event totals, plus per-key counts for queries, misses, files and users
+TOTAL = "total"
+QUERY = "query"
+ZERO_RESULT_QUERY = "zero_query"
+FILE = "file"
+USER = "user"
+
+# Longest query text kept as a rollup key
+MAX_QUERY_KEY_LENGTH = 100
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the rollup bucket containing moment"""
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+class AnalyticsBuffer:
+    """Search and download events folded into minute/hour rollups and written in batches
+
+    Every rollup is one small document keyed by (granularity, bucket, kind,
+    key) holding a count, so reports read pre-aggregated rows and a busy
+    hour never grows a single document without bound.
+    """
+
+    def __init__(self, collection, flush_interval: float, retention: Dict[str, timedelta]):
+        """Buffer events for collection; rollups expire after their granularity's retention"""
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.logger = logging.getLogger(__name__)
+        self.flushed_rows = 0
+        # (granularity, bucket, kind, key, field) -> count
+        self._pending: Dict[Tuple[str, datetime, str, str, str], int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def _count(self, kind: str, key: str, field: str = "count", moment: Optional[datetime] = None):
+        """Add one event to every granularity's bucket"""
+        moment = moment or datetime.utcnow()
+        for granularity in GRANULARITIES:
+            self._pending[(granularity, bucket_start(moment, granularity), kind, key, field)] += 1
+
+    def search(self, query: str, user_id: Optional[int], results: int):
+        """Record a search and whether it found anything"""
+        now = datetime.utcnow()
+        query = query[:MAX_QUERY_KEY_LENGTH]
+        self._count(TOTAL, "", "searches", now)
+        if query:
+            self._count(QUERY, query, moment=now)
+        if not results:
+            self._count(TOTAL, "", "zero_results", now)
+            if query:
+                self._count(ZERO_RESULT_QUERY, query, moment=now)
+        if user_id is not None:
+            self._count(USER, str(user_id), "searches", now)
+
+    def download(self, file_id: str, user_id: Optional[int]):
+        """Record a file delivery"""
+        now = datetime.utcnow()
+        self._count(TOTAL, "", "downloads", now)
+        self._count(FILE, file_id, moment=now)
+        if user_id is not None:
+            self._count(USER, str(user_id), "downloads", now)
+
+    async def flush(self) -> int:
+        """Write all buffered increments as one unordered bulk upsert"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, defaultdict(int)
+            rows: Dict[Tuple[str, datetime, str, str], Dict[str, int]] = defaultdict(dict)
+            for (granularity, bucket, kind, key, field), count in pending.items():
+                rows[(granularity, bucket, kind, key)][field] = count
+
+            operations = [
+                UpdateOne(
+                    {"granularity": granularity, "bucket": bucket, "kind": kind, "key": key},
+                    {"$inc": fields,
+                     "$setOnInsert": {"expires_at": bucket + self.retention[granularity]}},
+                    upsert=True
+                )
+                for (granularity, bucket, kind, key), fields in rows.items()
+            ]
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Keep the increments for the next flush
+                for entry, count in pending.items():
+                    self._pending[entry] += count
+                self.logger.error(f"❌ Error flushing analytics rollups: {e}")
+                return 0
+
+            self.flushed_rows += len(operations)
+            return len(operations)
+
+    async def _flush_periodically(self):
+        """Flush on a fixed interval until stopped"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop the periodic task and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def totals(self, granularity: str, since: datetime) -> Dict[str, int]:
+        """Summed event totals of the rollups since a moment"""
+        totals = {"searches": 0, "zero_results": 0, "downloads": 0}
+        async for row in self.collection.find(
+            {"granularity": granularity, "bucket": {"$gte": since}, "kind": TOTAL}
+        ):
+            for field in totals:
+                totals[field] += row.get(field, 0)
+        return totals
+
+    async def top(self, granularity: str, since: datetime, kind: str, limit: int = 10,
+                  field: str = "count") -> List[Tuple[str, int]]:
+        """Keys of one rollup kind with the highest summed counts since a moment"""
+        rows = await self.collection.aggregate([
+            {"$match": {"granularity": granularity, "bucket": {"$gte": since}, "kind": kind}},
+            {"$group": {"_id": "$key", "count": {"$sum": f"${field}"}}},
+            {"$match": {"count": {"$gt": 0}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit}
+        ]).to_list(length=limit)
+        return [(row["_id"], row["count"]) for row in rows]
@@ -0,0 +1,144 @@
+import heapq
+import sys
+import os
+from bisect import bisect_left, insort
+from typing import Dict, List, Set
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tokenize
+
+# Fields kept in memory for autocomplete results
+AUTOCOMPLETE_FIELDS = ("file_id", "short_id", "file_name", "file_type", "file_size", "downloads")
+
+# Upper bound on distinct tokens expanded for one prefix, keeps short prefixes cheap
+MAX_PREFIX_TOKENS = 512
+
+class AutocompleteIndex:
+    """In-memory prefix index over file name tokens, ranked by downloads"""
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self.ready = False
+        self._files: Dict[str, Dict] = {}
+        self._tokens_by_file: Dict[str, List[str]] = {}
+        self._files_by_token: Dict[str, Set[str]] = {}
+        # Sorted vocabulary for bisect prefix lookups
+        self._vocabulary: List[str] = []
+        self._unsorted = False
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def add(self, file: Dict):
+        """Add or replace a file; while loading, sorting the vocabulary is deferred"""
+        file_id = file.get("file_id")
+        if not file_id:
+            return
+
+        previous = self._files.get(file_id, {})
+        stored = {field: file.get(field, previous.get(field)) for field in AUTOCOMPLETE_FIELDS}
+        stored["downloads"] = stored["downloads"] or 0
+        self._files[file_id] = stored
+
+        tokens = sorted(set(file.get("tokens") or tokenize(stored["file_name"] or "")))
+        if self._tokens_by_file.get(file_id) == tokens:
+            return
+        self._unlink(file_id)
+        self._tokens_by_file[file_id] = tokens
+
+        for token in tokens:
+            files = self._files_by_token.get(token)
+            if files is None:
+                self._files_by_token[token] = {file_id}
+                if not self.ready:
+                    self._vocabulary.append(token)
+                    self._unsorted = True
+                else:
+                    self._sort()
+                    insort(self._vocabulary, token)
+            else:
+                files.add(file_id)
+
+    def remove(self, file_id: str):
+        """Remove a file from the index"""
+        self._unlink(file_id)
+        self._files.pop(file_id, None)
+
+    def _unlink(self, file_id: str):
+        """Detach a file from its tokens, dropping tokens nothing uses anymore"""
+        for token in self._tokens_by_file.pop(file_id, []):
+            files = self._files_by_token.get(token)
+            if files is None:
+                continue
+            files.discard(file_id)
+            if not files:
+                del self._files_by_token[token]
+                self._sort()
+                position = bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    del self._vocabulary[position]
+
+    def _sort(self):
+        """Sort the vocabulary after a load"""
+        if self._unsorted:
+            self._vocabulary.sort()
+            self._unsorted = False
+
+    def update_fields(self, file_id: str, fields: Dict):
+        """Update stored fields of a file that do not affect its tokens"""
+        file = self._files.get(file_id)
+        if file is not None:
+            file.update({field: value for field, value in fields.items() if field in AUTOCOMPLETE_FIELDS})
+
+    def bump(self, file_id: str, downloads: int = 1):
+        """Add downloads to a file's popularity"""
+        file = self._files.get(file_id)
+        if file is not None:
+            file["downloads"] += downloads
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        """Files having at least one token that starts with prefix"""
+        self._sort()
+        start = bisect_left(self._vocabulary, prefix)
+        matches: Set[str] = set()
+        for token in self._vocabulary[start:start + MAX_PREFIX_TOKENS]:
+            if not token.startswith(prefix):
+                break
+            matches.update(self._files_by_token[token])
+        return matches
+
+    def complete(self, query: str, limit: int = 50) -> List[Dict]:
+        """Files whose names contain the complete query words and a word starting with the last one"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        *words, prefix = tokens
+        candidates = None
+        # Intersect the exact words smallest-first before expanding the prefix
+        for word in sorted(words, key=lambda w: len(self._files_by_token.get(w, ()))):
+            files = self._files_by_token.get(word)
+            if not files:
+                return []
+            candidates = set(files) if candidates is None else candidates & files
+            if not candidates:
+                return []
+
+        if candidates is not None and len(candidates) <= MAX_PREFIX_TOKENS:
+            # Few candidates left: check their own tokens instead of the vocabulary
+            candidates = {
+                file_id for file_id in candidates
+                if any(token.startswith(prefix) for token in self._tokens_by_file[file_id])
+            }
+        else:
+            matches = self._prefix_matches(prefix)
+            candidates = matches if candidates is None else candidates & matches
+
+        best = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda file_id: (-self._files[file_id]["downloads"], len(self._files[file_id]["file_name"] or ""))
+        )
+        return [dict(self._files[file_id]) for file_id in best]
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+class TTLCache:
+    """Size-bounded LRU cache with optional per-entry expiry and hit/miss counters"""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
+        """Initialize the cache; ttl is in seconds, None keeps entries until evicted"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """Return the live entry for a key, dropping it if it has expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] and entry[0] < time.monotonic():
+            self.pop(key)
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value and mark it as recently used"""
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else 0.0
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            oldest = next(iter(self._data))
+            self.pop(oldest)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        if self.on_evict:
+            self.on_evict(key)
+        return entry[1]
+
+    def keys(self) -> List[Hashable]:
+        """Snapshot of the cached keys"""
+        return list(self._data)
+
+    def clear(self):
+        """Drop every entry"""
+        for key in self.keys():
+            self.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+class QueryCache:
+    """Search result cache keyed by normalized query and limit"""
+
+    def __init__(self, max_size: int, ttl: float):
+        """Initialize the cache and its token -> cached keys lookup"""
+        self._cache = TTLCache(max_size, ttl, on_evict=self._forget)
+        self._keys_by_token: Dict[str, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @staticmethod
+    def make_key(tokens: List[str], limit: int, *extra: Hashable) -> Tuple:
+        """Build a cache key from normalized query tokens"""
+        return (" ".join(tokens), limit) + extra
+
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        """Get cached results for a key"""
+        results = self._cache.get(key)
+        return list(results) if results is not None else None
+
+    def set(self, key: Tuple, tokens: List[str], results: List[Dict]):
+        """Cache results and remember which tokens they depend on"""
+        self._cache.set(key, list(results))
+        # Filter-only queries have no tokens and are invalidated by every new file
+        for token in tokens or [""]:
+            self._keys_by_token.setdefault(token, set()).add(key)
+
+    def _forget(self, key: Tuple):
+        """Drop an evicted key from the token lookup"""
+        for token in key[0].split() or [""]:
+            keys = self._keys_by_token.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_token[token]
+
+    def invalidate_tokens(self, tokens: List[str]) -> int:
+        """Drop every entry whose query could match a file with these tokens"""
+        affected = set(self._keys_by_token.get("", ()))
+        for token in set(tokens):
+            # Query tokens may be word prefixes of the file tokens
+            for end in range(1, len(token) + 1):
+                affected.update(self._keys_by_token.get(token[:end], ()))
+        for key in affected:
+            self._cache.pop(key)
+        return len(affected)
+
+    def clear(self):
+        """Drop every cached result"""
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        """Cache size and hit/miss counters"""
+        return self._cache.stats()
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one shared awaitable
+
+    The shared call keeps running while any caller waits on it and is
+    cancelled once the last one is cancelled, so superseded work stops.
+    """
+
+    def __init__(self):
+        """Initialize the in-flight table and counters"""
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self._in_flight: Dict[Hashable, "asyncio.Future"] = {}
+        # Shared call -> callers still waiting on it
+        self._waiters: Dict["asyncio.Future", int] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func once per key at a time; concurrent callers share its result"""
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            # A cancelled caller must not cancel the shared call for everyone else
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                self.abandoned += 1
+                future.cancel()
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    def stats(self) -> Dict[str, int]:
+        """Call and coalescing counters"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._in_flight)
+        }
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+from pymongo import UpdateOne
+
+class DownloadCounter:
+    """Write-behind download counters folded per file and flushed in bulk"""
+
+    def __init__(self, collection, flush_interval: float, flush_threshold: int):
+        """Flush every flush_interval seconds or after flush_threshold increments"""
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.logger = logging.getLogger(__name__)
+        self.flushed_events = 0
+        self.flushed_writes = 0
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._events = 0
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Increments not written yet"""
+        return self._events
+
+    def add(self, file_id: str, count: int = 1):
+        """Count downloads of a file, flushing early once enough have piled up"""
+        self._pending[file_id] += count
+        self._events += count
+        if self._events >= self.flush_threshold and not self._flush_lock.locked():
+            asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> int:
+        """Write all pending increments as one unordered bulk write"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, events = self._pending, self._events
+            self._pending, self._events = defaultdict(int), 0
+            try:
+                # No upsert: a download must never create an empty file document
+                await self.collection.bulk_write(
+                    [UpdateOne({"file_id": file_id}, {"$inc": {"downloads": count}})
+                     for file_id, count in pending.items()],
+                    ordered=False
+                )
+            except Exception as e:
+                # Put the increments back so the next flush retries them
+                for file_id, count in pending.items():
+                    self._pending[file_id] += count
+                self._events += events
+                self.logger.error(f"❌ Error flushing download counters: {e}")
+                return 0
+
+            self.flushed_events += events
+            self.flushed_writes += len(pending)
+            return len(pending)
+
+    async def _flush_periodically(self):
+        """Flush on a fixed interval until stopped"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stop the periodic task and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
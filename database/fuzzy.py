@@ -0,0 +1,102 @@
+import sys
+import os
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tokenize
+
+# Tokens shorter than this are never corrected, a one-letter typo there is a different word
+MIN_FUZZY_LENGTH = 4
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, capped at max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class FuzzyMatcher:
+    """Symmetric-delete spelling dictionary over the indexed token vocabulary"""
+
+    def __init__(self, max_distance: int = 2):
+        """Initialize an empty dictionary"""
+        self.max_distance = max_distance
+        self.ready = False
+        # token -> number of files containing it
+        self._counts: Dict[str, int] = {}
+        # deletion variant -> tokens it was derived from
+        self._deletes: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _variants(self, token: str) -> Set[str]:
+        """All strings reachable from token by deleting up to max_distance characters"""
+        variants = {token}
+        for distance in range(1, min(self.max_distance, len(token) - 1) + 1):
+            for positions in combinations(range(len(token)), distance):
+                skip = set(positions)
+                variants.add("".join(c for i, c in enumerate(token) if i not in skip))
+        return variants
+
+    def add_tokens(self, tokens: Iterable[str]):
+        """Register the tokens of one file"""
+        for token in set(tokens):
+            if token in self._counts:
+                self._counts[token] += 1
+                continue
+            self._counts[token] = 1
+            if len(token) < MIN_FUZZY_LENGTH or token.isdigit():
+                continue
+            for variant in self._variants(token):
+                self._deletes.setdefault(variant, set()).add(token)
+
+    def add(self, file: Dict):
+        """Register the tokens of a file document"""
+        self.add_tokens(file.get("tokens") or tokenize(file.get("file_name", "")))
+
+    def correct(self, token: str) -> Optional[str]:
+        """Closest known token within max_distance, preferring frequent tokens"""
+        if token in self._counts or len(token) < MIN_FUZZY_LENGTH or token.isdigit():
+            return None
+
+        best = None
+        best_key = None
+        candidates: Set[str] = set()
+        for variant in self._variants(token):
+            candidates.update(self._deletes.get(variant, ()))
+
+        for candidate in candidates:
+            distance = edit_distance(token, candidate, self.max_distance)
+            if distance > self.max_distance:
+                continue
+            key = (distance, -self._counts[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+    def rewrite(self, query: str) -> Optional[str]:
+        """Rewrite the misspelled tokens of a query, None when nothing changed"""
+        tokens = tokenize(query)
+        corrected: List[str] = []
+        changed = False
+        for token in tokens:
+            replacement = self.correct(token)
+            corrected.append(replacement or token)
+            changed = changed or replacement is not None
+        return " ".join(corrected) if changed else None
@@ -1,28 +1,167 @@
+import asyncio
 import logging
+import math
+import re
+import time
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Dict, List, Optional, Union
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Any, Dict, List, Optional, Tuple, Union
 from bson import ObjectId
 
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
+from database.search_index import SearchIndex, INDEXED_FIELDS
+from database.cache import QueryCache, SingleFlight, TTLCache
+from database.autocomplete import AutocompleteIndex
+from database.fuzzy import FuzzyMatcher
+from database.counters import DownloadCounter
+from database.pool import PoolMetrics
+from database.stats import StatsCounters
+from database.analytics import AnalyticsBuffer
+from database.users import UserRegistry
+from database.ratelimit import LocalRateLimiter, MongoRateLimiter
+from utils import normalize_text, tokenize, parse_release_name, parse_search_query, file_fingerprint, encode_short_id
+
+# Fields needed to deliver a file, kept in the hot file cache
+FILE_CACHE_FIELDS = ("file_id", "short_id", "file_name", "file_type", "file_size", "mime_type")
+
+# Case-insensitive collation used by the file name prefix index
+PREFIX_COLLATION = {"locale": "en", "strength": 2}
+
+class SearchPlan:
+    """Snapshot of the query strategies the files collection supports"""
+    
+    TOKENS = "tokens"
+    TEXT = "text"
+    PREFIX = "prefix"
+    REGEX = "regex"
+    
+    def __init__(self, indexes: Optional[Dict] = None):
+        """Derive the available strategies from index_information() output"""
+        indexes = indexes or {}
+        self.tokens_index = None
+        self.text_index = None
+        self.prefix_index = None
+        self.detected_at = time.monotonic()
+        
+        for name, info in indexes.items():
+            keys = info.get("key", [])
+            if any(field == "_fts" for field, _ in keys):
+                self.text_index = name
+            elif keys and keys[0] == ("tokens", 1):
+                self.tokens_index = name
+            elif keys and keys[0] == ("file_name", 1) and \
+                    (info.get("collation") or {}).get("strength") == PREFIX_COLLATION["strength"]:
+                self.prefix_index = name
+    
+    @property
+    def strategies(self) -> List[str]:
+        """Query strategies the indexes support, best first"""
+        strategies = []
+        if self.tokens_index:
+            strategies.append(self.TOKENS)
+        if self.text_index:
+            strategies.append(self.TEXT)
+        if self.prefix_index:
+            strategies.append(self.PREFIX)
+        if not strategies:
+            strategies.append(self.REGEX)
+        return strategies
+    
+    @property
+    def best(self) -> str:
+        """The strategy searches run with, a miss there is final"""
+        return self.strategies[0]
+    
+    def age(self) -> float:
+        """Seconds since the plan was detected"""
+        return time.monotonic() - self.detected_at
+    
+    def describe(self) -> Dict[str, Optional[str]]:
+        """Summary of the plan for logs and admin commands"""
+        return {
+            "tokens_index": self.tokens_index,
+            "text_index": self.text_index,
+            "prefix_index": self.prefix_index,
+            "strategies": ", ".join(self.strategies)
+        }
 
 class Database:
     """Database class to handle all database operations"""
     
     def __init__(self, uri: str, database_name: str = "movie_filter_bot"):
         """Initialize the database connection"""
+        self.logger = logging.getLogger(__name__)
+        self._initialized = None
         try:
-            self._client = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=5000)
+            # One pooled client per process, sized for the handler workers
+            self.pool_metrics = PoolMetrics(Config.MONGO_MAX_POOL_SIZE)
+            self._client = AsyncIOMotorClient(
+                uri,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+                readPreference=Config.MONGO_READ_PREFERENCE,
+                event_listeners=[self.pool_metrics]
+            )
             self.db = self._client.get_database(database_name)
             self.users = self.db.users
             self.files = self.db.files
             self.chats = self.db.chats
-            self.logger = logging.getLogger(__name__)
+            self.counters = self.db.counters
+            self.index_checkpoints = self.db.index_checkpoints
+            self.analytics_rollups = self.db.analytics_rollups
+            self.rate_limits = self.db.rate_limits
+            # Optional in-memory search index, Mongo stays the source of truth
+            self.search_index = SearchIndex(
+                text_weight=Config.RANK_TEXT_WEIGHT, default_popularity=Config.RANK_RECENCY_WEIGHT
+            ) if Config.IN_MEMORY_INDEX else None
+            # Optional prefix index answering inline autocomplete from memory
+            self.autocomplete_index = AutocompleteIndex() if Config.AUTOCOMPLETE_INDEX else None
+            # Optional typo correction used when a search finds nothing
+            self.fuzzy_matcher = FuzzyMatcher(Config.FUZZY_MAX_DISTANCE) if Config.FUZZY_SEARCH else None
+            # Search strategies detected from index metadata, refreshed in the background
+            self.search_plan = SearchPlan()
+            self._plan_task = None
+            # Per-file popularity (downloads + recency) is recomputed in the background
+            self._popularity_task = None
+            # Bounded result cache in front of search_files
+            self.query_cache = QueryCache(Config.SEARCH_CACHE_SIZE, Config.SEARCH_CACHE_TTL) \
+                if Config.SEARCH_CACHE_SIZE > 0 else None
+            # Identical concurrent searches share one backend call
+            self.search_flight = SingleFlight()
+            # Serializes the lookup-then-write duplicate merge of _write_files
+            self._write_lock = asyncio.Lock()
+            # Known users and bans, answered from memory once loaded
+            self.user_registry = UserRegistry(Config.USER_CACHE_SIZE)
+            # /stats counters kept current by the write path
+            self.stats = StatsCounters()
+            self._stats_task = None
+            self._stats_flight = SingleFlight()
+            # Banned ids reloaded from Mongo, bans are shared between processes through it
+            self._bans_task = None
+            # One-off loads and backfills, referenced until they finish and cancelled on close
+            self._background_tasks: set = set()
+            # Hot file metadata filled by search results, so downloads skip Mongo
+            self.file_cache = TTLCache(Config.FILE_CACHE_SIZE, Config.FILE_CACHE_TTL) \
+                if Config.FILE_CACHE_SIZE > 0 else None
+            # Download clicks are folded in memory and written back in bulk
+            self.download_counter = DownloadCounter(
+                self.files, Config.DOWNLOAD_FLUSH_INTERVAL, Config.DOWNLOAD_FLUSH_THRESHOLD
+            )
+            # Search and download events, rolled up per minute and hour
+            self.analytics = AnalyticsBuffer(
+                self.analytics_rollups, Config.ANALYTICS_FLUSH_INTERVAL,
+                {"minute": timedelta(days=Config.ANALYTICS_MINUTE_RETENTION_DAYS),
+                 "hour": timedelta(days=Config.ANALYTICS_HOUR_RETENTION_DAYS)}
+            )
             # Test the connection
             self._client.admin.command('ping')
         except Exception as e:
@@ -31,77 +170,138 @@ class Database:
         
     async def init_db(self):
         """Initialize database indexes with proper error handling"""
+        # bot.py and MovieBot.start both initialize the shared handle, do it once
+        if self._initialized is not None:
+            return self._initialized
         try:
             # Get the current event loop
             loop = asyncio.get_running_loop()
             
-            # Create a new task to run the index creation
+            # Indexes as (collection, keys, options). Indexes can't be built inside a
+            # transaction on collections that already hold data, so each one is
+            # created on its own; create_index is a no-op when it already exists.
+            index_specs = [
+                (self.users, [("user_id", 1)], {"name": "user_id_unique", "unique": True}),
+                (self.users, [("banned", 1)], {"name": "banned"}),
+                (self.files, [("file_name", "text")], {"name": "file_name_text"}),
+                (self.files, [("file_id", 1)], {"name": "file_id_unique", "unique": True}),
+                (self.files, [("file_name", 1)], {"name": "file_name_prefix", "collation": PREFIX_COLLATION}),
+                # Duplicate detection: Telegram's file_unique_id and content fingerprint
+                (self.files, [("file_unique_id", 1)], {"name": "file_unique_id_unique", "unique": True, "sparse": True}),
+                # Compact id carried in callback data instead of the long file_id
+                (self.files, [("short_id", 1)], {"name": "short_id_unique", "unique": True, "sparse": True}),
+                (self.files, [("unique_ids", 1)], {"name": "unique_ids"}),
+                (self.files, [("fingerprint", 1)], {"name": "fingerprint"}),
+                # Parsed release metadata written by add_file
+                (self.files, [("tokens", 1)], {"name": "tokens"}),
+            ]
+            index_specs += [
+                (self.files, [(field, 1)], {"name": field, "sparse": True})
+                for field in ("year", "resolution", "codec", "source", "languages")
+            ]
+            index_specs.append(
+                (self.files, [("title", 1), ("season", 1), ("episode", 1)], {"name": "title_season_episode"})
+            )
+            # Compound indexes backing structured search filters
+            index_specs += [
+                (self.files, keys, {"name": "_".join(field for field, _ in keys)})
+                for keys in (
+                    [("tokens", 1), ("year", 1), ("resolution", 1)],
+                    [("year", 1), ("resolution", 1), ("file_size", 1)],
+                    [("resolution", 1), ("file_size", 1)],
+                    [("file_type", 1), ("file_size", 1)]
+                )
+            ]
+            index_specs += [
+                (self.chats, [("chat_id", 1)], {"name": "chat_id_unique", "unique": True}),
+                # One indexing checkpoint per channel
+                (self.index_checkpoints, [("chat_id", 1)], {"name": "chat_id_unique", "unique": True}),
+                # One analytics rollup row per bucket and key, expired by TTL
+                (self.analytics_rollups, [("granularity", 1), ("bucket", 1), ("kind", 1), ("key", 1)],
+                 {"name": "rollup_unique", "unique": True}),
+                (self.analytics_rollups, [("expires_at", 1)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+                # Shared rate limit buckets disappear once they would be full again
+                (self.rate_limits, [("expires_at", 1)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+            ]
+            
             async def _create_indexes():
-                try:
-                    # Create all indexes in a single transaction if supported
-                    async with await self._client.start_session() as session:
-                        async with session.start_transaction():
-                            # Create user index
-                            await self.users.create_index(
-                                [("user_id", 1)],
-                                name="user_id_unique",
-                                unique=True,
-                                session=session
-                            )
-                            
-                            # Create file indexes
-                            await self.files.create_index(
-                                [("file_name", "text")],
-                                name="file_name_text",
-                                session=session
-                            )
-                            
-                            await self.files.create_index(
-                                [("file_id", 1)],
-                                name="file_id_unique",
-                                unique=True,
-                                session=session
-                            )
-                            
-                            # Create chat index
-                            await self.chats.create_index(
-                                [("chat_id", 1)],
-                                name="chat_id_unique",
-                                unique=True,
-                                session=session
-                            )
-                            
-                    self.logger.info("✅ Database indexes verified/created successfully")
-                    return True
-                    
-                except Exception as e:
-                    if "already exists" in str(e).lower() or "E11000" in str(e):
-                        self.logger.info("ℹ️ Database indexes already exist")
-                        return True
-                    self.logger.error(f"❌ Error creating database indexes: {e}", exc_info=True)
+                failed = []
+                for collection, keys, options in index_specs:
+                    try:
+                        await collection.create_index(keys, **options)
+                    except Exception as e:
+                        failed.append(f"{collection.name}.{options['name']}")
+                        self.logger.error(f"❌ Error creating index {collection.name}.{options['name']}: {e}")
+                
+                if failed:
+                    self.logger.error(f"❌ {len(failed)} database indexes are missing: {', '.join(failed)}")
                     return False
+                self.logger.info("✅ Database indexes verified/created successfully")
+                return True
             
             # Run the index creation in the current event loop
-            return await _create_indexes()
+            indexes_ok = await _create_indexes()
+            
+            # Detect the search strategies once and keep them in memory
+            await self.refresh_search_plan()
+            if self._plan_task is None and Config.SEARCH_PLAN_REFRESH_INTERVAL > 0:
+                self._plan_task = asyncio.create_task(self._refresh_search_plan_periodically())
+            
+            # Warm the in-memory indexes from the files collection
+            await self.load_memory_indexes()
+            
+            # Bans must be known before serving, the rest of the registry fills in the background
+            await self.load_banned_users()
+            if self._bans_task is None and Config.BAN_RELOAD_INTERVAL > 0:
+                self._bans_task = asyncio.create_task(self._reload_banned_users_periodically())
+            self._run_in_background(self.load_user_registry())
+            
+            # Score popularity now and keep it fresh for ranking
+            if self._popularity_task is None and Config.POPULARITY_REFRESH_INTERVAL > 0:
+                self._popularity_task = asyncio.create_task(self._refresh_popularity_periodically())
+            
+            # Parse files stored before ingest-time parsing existed
+            self._run_in_background(self.backfill_parsed_fields())
+            self._run_in_background(self.backfill_short_ids())
+            
+            # Write buffered download counts and analytics in the background
+            self.download_counter.start()
+            self.analytics.start()
+            
+            # Seed the stats counters and keep the per-type breakdown reconciled
+            if self._stats_task is None:
+                self._stats_task = asyncio.create_task(self._reconcile_stats_periodically())
+            
+            self._initialized = indexes_ok
+            return indexes_ok
             
         except Exception as e:
             self.logger.error(f"❌ Critical error in database initialization: {e}", exc_info=True)
             return False
     
     # User-related methods
-    async def add_user(self, user_id: int, username: str = "", first_name: str = ""):
-        """Add a new user to the database"""
-        try:
-            user = {
-                "user_id": user_id,
-                "username": username,
-                "first_name": first_name,
-                "banned": False,
-                "join_date": datetime.utcnow()
-            }
-            await self.users.update_one({"user_id": user_id}, {"$set": user}, upsert=True)
+    async def add_user(self, user_id: int, username: str = "", first_name: str = "") -> bool:
+        """Add a user to the database, skipping the write when nothing changed
+        
+        Only the profile fields are updated for returning users, join_date
+        and banned are set when the user is first inserted. Returns True
+        only when this call inserted the user.
+        """
+        if not self.user_registry.needs_write(user_id, username, first_name):
+            return False
+        try:
+            result = await self.users.update_one(
+                {"user_id": user_id},
+                {"$set": {"username": username, "first_name": first_name},
+                 "$setOnInsert": {"banned": False, "join_date": datetime.utcnow()}},
+                upsert=True
+            )
+            self.user_registry.remember(user_id, username, first_name)
+            inserted = result.upserted_id is not None
+            if inserted:
+                self.stats.user_added()
             self.logger.info(f"✅ User {user_id} added/updated in database")
-            return True
+            return inserted
         except Exception as e:
             self.logger.error(f"❌ Error adding user to database: {e}")
             return False
@@ -116,7 +316,9 @@ class Database:
             return None
     
     async def is_user_banned(self, user_id: int) -> bool:
-        """Check if a user is banned"""
+        """Check if a user is banned, from memory once the banned ids are loaded"""
+        if self.user_registry.ready:
+            return self.user_registry.is_banned(user_id)
         try:
             user = await self.get_user(user_id)
             if user:
@@ -126,12 +328,238 @@ class Database:
             self.logger.error(f"❌ Error checking if user is banned: {e}")
             return False
     
+    async def set_user_banned(self, user_id: int, banned: bool = True) -> bool:
+        """Ban or unban a user, who does not need to have started the bot"""
+        try:
+            result = await self.users.update_one(
+                {"user_id": user_id},
+                {"$set": {"banned": banned}, "$setOnInsert": {"join_date": datetime.utcnow()}},
+                upsert=True
+            )
+            self.user_registry.set_banned(user_id, banned)
+            if result.upserted_id is not None:
+                self.stats.user_added()
+            self.logger.info(f"✅ User {user_id} {'banned' if banned else 'unbanned'}")
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error updating ban for user {user_id}: {e}")
+            return False
+    
+    async def load_banned_users(self) -> bool:
+        """Load the banned ids so ban checks are answered from memory"""
+        try:
+            banned = {user["user_id"] async for user in self.users.find({"banned": True}, {"_id": 0, "user_id": 1})}
+            self.user_registry.replace_banned(banned)
+            self.user_registry.ready = True
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error loading banned users: {e}")
+            return False
+    
+    async def _reload_banned_users_periodically(self):
+        """Pick up bans and unbans made by other bot processes"""
+        while True:
+            await asyncio.sleep(Config.BAN_RELOAD_INTERVAL)
+            await self.load_banned_users()
+    
+    async def load_user_registry(self) -> int:
+        """Register every stored user so returning users skip redundant writes"""
+        loaded = 0
+        try:
+            started = time.monotonic()
+            async for user in self.users.find(
+                {}, {"_id": 0, "user_id": 1, "username": 1, "first_name": 1, "banned": 1},
+                batch_size=Config.INDEX_LOAD_BATCH_SIZE
+            ):
+                self.user_registry.add(user)
+                loaded += 1
+            self.logger.info(f"✅ User registry loaded with {loaded:,} users in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            self.logger.error(f"❌ Error loading user registry: {e}", exc_info=True)
+        return loaded
+    
+    def rate_limiter(self, rate: float, burst: int):
+        """Token-bucket limiter on the configured backend, shared through Mongo or local to this process"""
+        if Config.RATE_LIMIT_BACKEND == "mongo":
+            return MongoRateLimiter(self.rate_limits, rate, burst)
+        return LocalRateLimiter(rate, burst)
+    
     # File-related methods
+    @staticmethod
+    def _file_document(file_id: str, file_name: str, file_type: str, file_size: int,
+                       mime_type: str = "", caption: str = "", chat_id: int = None,
+                       file_unique_id: str = None, duration: int = 0) -> Dict:
+        """Build the stored document for a file"""
+        file = {
+            "file_id": file_id,
+            "file_name": file_name,
+            "file_type": file_type,
+            "file_size": file_size,
+            "mime_type": mime_type,
+            "caption": caption,
+            "chat_id": chat_id,
+            "duration": duration or 0,
+            "fingerprint": file_fingerprint(file_name, file_size, duration),
+            "date_added": datetime.utcnow(),
+            # Parse the release name once so searches can use exact indexed fields
+            **parse_release_name(file_name)
+        }
+        if file_unique_id:
+            file["file_unique_id"] = file_unique_id
+        return file
+    
+    def _file_stored(self, file: Dict):
+        """Reflect a written file in the in-memory indexes and the result cache"""
+        for index in self._memory_indexes():
+            index.add(file)
+        if self.file_cache is not None and (file.get("short_id") or file["file_id"]) in self.file_cache:
+            self._remember_files([file])
+        if self.query_cache is not None:
+            self.query_cache.invalidate_tokens(file["tokens"])
+    
+    async def _write_files(self, files: List[Dict]) -> Tuple[int, int]:
+        """Upsert files, merging duplicates into one canonical record per file
+        
+        A file is a duplicate when its file_unique_id or its fingerprint
+        (normalized name + size + duration) matches an existing record or an
+        earlier file of the batch. Duplicates only add their ids to the
+        canonical record's ``file_ids``/``unique_ids`` lists. Returns the
+        number of files written and how many of them were merged.
+        
+        Writes are serialized, so two writers can't both miss the same
+        duplicate between the lookup and the write. Only records that were
+        refreshed or actually inserted reach the in-memory indexes.
+        """
+        documents = [
+            self._file_document(
+                file["file_id"], file.get("file_name", ""), file.get("file_type", "unknown"),
+                file.get("file_size", 0), file.get("mime_type", ""), file.get("caption", ""),
+                file.get("chat_id"), file.get("file_unique_id"), file.get("duration", 0)
+            )
+            for file in files if file.get("file_id")
+        ]
+        if not documents:
+            return 0, 0
+        
+        async with self._write_lock:
+            return await self._write_documents(documents)
+    
+    async def _write_documents(self, documents: List[Dict]) -> Tuple[int, int]:
+        """Resolve documents to canonical records and write them, under the write lock"""
+        # One lookup resolves every file of the batch to an existing canonical record
+        unique_ids = [doc["file_unique_id"] for doc in documents if doc.get("file_unique_id")]
+        existing = await self.files.find(
+            {"$or": [
+                {"file_id": {"$in": [doc["file_id"] for doc in documents]}},
+                {"unique_ids": {"$in": unique_ids}},
+                {"file_unique_id": {"$in": unique_ids}},
+                {"fingerprint": {"$in": [doc["fingerprint"] for doc in documents]}}
+            ]},
+            {"file_id": 1, "file_unique_id": 1, "unique_ids": 1, "fingerprint": 1}
+        ).to_list(length=None)
+        
+        canonical = {}
+        for record in existing:
+            canonical[("fingerprint", record.get("fingerprint"))] = record["_id"]
+            canonical[("file_id", record["file_id"])] = record["_id"]
+            # Records stored before unique_ids existed only carry file_unique_id
+            for unique_id in (record.get("unique_ids") or []) + [record.get("file_unique_id")]:
+                if unique_id:
+                    canonical[("unique_id", unique_id)] = record["_id"]
+        
+        # Group the batch by canonical record: existing _id or the first new document
+        existing_ids = {record["_id"] for record in existing}
+        groups: Dict[Any, Dict] = {}
+        for doc in documents:
+            keys = [("file_id", doc["file_id"]), ("unique_id", doc.get("file_unique_id")),
+                    ("fingerprint", doc["fingerprint"])]
+            target = next((canonical[key] for key in keys if key[1] and key in canonical), None)
+            if target is None:
+                target = doc["file_id"]
+                for key in keys:
+                    if key[1]:
+                        canonical[key] = target
+            
+            group = groups.get(target)
+            if group is None:
+                groups[target] = group = {"doc": doc, "file_ids": [], "unique_ids": [], "refresh": None}
+            group["file_ids"].append(doc["file_id"])
+            if doc.get("file_unique_id"):
+                group["unique_ids"].append(doc["file_unique_id"])
+            if target in existing_ids and canonical.get(("file_id", doc["file_id"])) == target:
+                # The record's own file is being re-indexed
+                group["refresh"] = doc
+        
+        # New records get their short ids in one counter round-trip
+        new_groups = [group for target, group in groups.items() if target not in existing_ids]
+        if new_groups:
+            for group, short_id in zip(new_groups, await self._allocate_short_ids(len(new_groups))):
+                group["doc"]["short_id"] = short_id
+        
+        operations = []
+        # Refreshed records by operation index, reflected unless their update failed
+        refreshed: Dict[int, Dict] = {}
+        # Upsert operation index -> document, reflected only when it was actually inserted
+        upserts: Dict[int, Dict] = {}
+        for target, group in groups.items():
+            doc = group["doc"]
+            add_to_set = {"file_ids": {"$each": group["file_ids"]}}
+            if group["unique_ids"]:
+                add_to_set["unique_ids"] = {"$each": group["unique_ids"]}
+            
+            if target in existing_ids:
+                update = {"$addToSet": add_to_set}
+                if group["refresh"] is not None:
+                    # Re-indexing a known file refreshes its metadata, but it keeps its age
+                    refresh = {key: value for key, value in group["refresh"].items() if key != "date_added"}
+                    update["$set"] = {key: value for key, value in refresh.items() if key != "file_id"}
+                    refreshed[len(operations)] = refresh
+                operations.append(UpdateOne({"_id": target}, update))
+            elif doc.get("file_unique_id"):
+                upserts[len(operations)] = doc
+                operations.append(UpdateOne(
+                    {"file_unique_id": doc["file_unique_id"]},
+                    {"$setOnInsert": {key: value for key, value in doc.items() if key != "file_unique_id"},
+                     "$addToSet": add_to_set},
+                    upsert=True
+                ))
+            else:
+                upserts[len(operations)] = doc
+                operations.append(UpdateOne(
+                    {"file_id": doc["file_id"]},
+                    {"$set": {key: value for key, value in doc.items() if key not in ("short_id", "date_added")},
+                     "$setOnInsert": {"short_id": doc["short_id"], "date_added": doc["date_added"]},
+                     "$addToSet": add_to_set},
+                    upsert=True
+                ))
+        
+        def reflect(inserted, failed) -> int:
+            """Mirror the refreshed and inserted records, returning how many there were"""
+            for index in inserted:
+                self.stats.file_added(upserts[index]["file_type"], upserts[index]["file_size"])
+            written = [doc for index, doc in refreshed.items() if index not in failed]
+            written += [upserts[index] for index in inserted]
+            for doc in written:
+                self._file_stored(doc)
+            return len(written)
+        
+        try:
+            result = await self.files.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered writes keep going past failures, mirror what made it before reporting
+            reflect(
+                [entry["index"] for entry in e.details.get("upserted", [])],
+                {error["index"] for error in e.details.get("writeErrors", [])}
+            )
+            raise
+        return len(documents), len(documents) - reflect(result.upserted_ids, set())
+    
     async def add_file(self, file_id: str, file_name: str, file_type: str, file_size: int, 
-                      mime_type: str = "", caption: str = "", chat_id: int = None) -> bool:
-        """Add a new file to the database"""
+                      mime_type: str = "", caption: str = "", chat_id: int = None,
+                      file_unique_id: str = None, duration: int = 0) -> bool:
+        """Add a new file to the database, merging it into an existing record if it is a duplicate"""
         try:
-            file = {
+            _, merged = await self._write_files([{
                 "file_id": file_id,
                 "file_name": file_name,
                 "file_type": file_type,
@@ -139,32 +567,576 @@ class Database:
                 "mime_type": mime_type,
                 "caption": caption,
                 "chat_id": chat_id,
-                "date_added": datetime.utcnow()
-            }
-            await self.files.update_one({"file_id": file_id}, {"$set": file}, upsert=True)
-            self.logger.info(f"✅ File {file_id} added/updated in database")
+                "file_unique_id": file_unique_id,
+                "duration": duration
+            }])
+            if merged:
+                self.logger.info(f"♻️ File {file_id} merged into an existing duplicate")
+            else:
+                self.logger.info(f"✅ File {file_id} added/updated in database")
             return True
         except Exception as e:
             self.logger.error(f"❌ Error adding file to database: {e}")
             return False
     
-    async def search_files(self, query: str, limit: int = 10) -> List[Dict]:
-        """Search for files in the database"""
+    async def add_files_bulk(self, files: List[Dict]) -> int:
+        """Upsert many files with one unordered bulk write
+        
+        ``files`` are dicts with the keyword arguments of ``add_file``, such as
+        the output of ``utils.get_media_info`` plus caption and chat_id.
+        Returns the number of files written.
+        """
+        if not files:
+            return 0
+        
         try:
-            # Using text search if available, otherwise use regex
-            if await self.files.index_information().get("file_name_text"):
-                cursor = self.files.find(
-                    {"$text": {"$search": query}},
-                    {"score": {"$meta": "textScore"}}
-                ).sort([("score", {"$meta": "textScore"})])
-            else:
-                cursor = self.files.find({"file_name": {"$regex": query, "$options": "i"}})
+            written, merged = await self._write_files(files)
+            self.logger.info(f"✅ Bulk wrote {written} files ({merged} merged as duplicates)")
+            return written
+        except BulkWriteError as e:
+            # Unordered writes keep going past failures, count what made it
+            written = e.details.get("nUpserted", 0) + e.details.get("nMatched", 0)
+            self.logger.error(f"❌ Bulk file write finished with {len(e.details.get('writeErrors', []))} errors")
+            return written
+        except Exception as e:
+            self.logger.error(f"❌ Error bulk adding files to database: {e}")
+            return 0
+    
+    async def backfill_parsed_fields(self, batch_size: int = 1000) -> int:
+        """Store parsed release metadata and fingerprints on files that do not have them yet"""
+        updated = 0
+        try:
+            batch = []
+            cursor = self.files.find(
+                {"fingerprint": {"$exists": False}},
+                {"file_id": 1, "file_name": 1, "file_size": 1, "duration": 1, "file_unique_id": 1}
+            )
+            async for file in cursor:
+                file_name = file.get("file_name", "")
+                fields = {
+                    **parse_release_name(file_name),
+                    "fingerprint": file_fingerprint(file_name, file.get("file_size", 0), file.get("duration", 0))
+                }
+                add_to_set = {"file_ids": file["file_id"]}
+                if file.get("file_unique_id"):
+                    add_to_set["unique_ids"] = file["file_unique_id"]
+                batch.append(UpdateOne({"_id": file["_id"]}, {"$set": fields, "$addToSet": add_to_set}))
+                if len(batch) >= batch_size:
+                    await self.files.bulk_write(batch, ordered=False)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                await self.files.bulk_write(batch, ordered=False)
+                updated += len(batch)
+            
+            if updated:
+                self.logger.info(f"✅ Parsed release metadata for {updated:,} existing files")
+        except Exception as e:
+            self.logger.error(f"❌ Error backfilling parsed file fields: {e}", exc_info=True)
+        return updated
+    
+    async def _allocate_short_ids(self, count: int) -> List[str]:
+        """Reserve count consecutive values of the short id counter"""
+        counter = await self.counters.find_one_and_update(
+            {"_id": "short_id"},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        end = counter["seq"]
+        return [encode_short_id(number) for number in range(end - count + 1, end + 1)]
+    
+    async def backfill_short_ids(self, batch_size: int = 1000) -> int:
+        """Give a short id to files stored before short ids existed"""
+        updated = 0
+        try:
+            cursor = self.files.find({"short_id": {"$exists": False}}, {"file_id": 1})
+            while True:
+                files = await cursor.to_list(length=batch_size)
+                if not files:
+                    break
+                short_ids = await self._allocate_short_ids(len(files))
+                await self.files.bulk_write([
+                    UpdateOne({"_id": file["_id"], "short_id": {"$exists": False}}, {"$set": {"short_id": short_id}})
+                    for file, short_id in zip(files, short_ids)
+                ], ordered=False)
+                for file, short_id in zip(files, short_ids):
+                    for index in (self.search_index, self.autocomplete_index):
+                        if index is not None:
+                            index.update_fields(file["file_id"], {"short_id": short_id})
+                updated += len(files)
+            
+            if updated:
+                self.logger.info(f"✅ Assigned short ids to {updated:,} existing files")
+        except Exception as e:
+            self.logger.error(f"❌ Error backfilling short ids: {e}", exc_info=True)
+        return updated
+    
+    def _memory_indexes(self) -> List:
+        """In-memory structures fed from the files collection"""
+        indexes = (self.search_index, self.autocomplete_index, self.fuzzy_matcher)
+        return [index for index in indexes if index is not None]
+    
+    async def load_memory_indexes(self) -> bool:
+        """Build the in-memory indexes from the files collection in a single pass"""
+        indexes = self._memory_indexes()
+        if not indexes:
+            return False
+        
+        try:
+            started = time.monotonic()
+            for index in indexes:
+                index.ready = False
+            loaded = 0
+            cursor = self.files.find({}, INDEXED_FIELDS, batch_size=Config.INDEX_LOAD_BATCH_SIZE)
+            async for file in cursor:
+                for index in indexes:
+                    index.add(file)
+                loaded += 1
+            for index in indexes:
+                index.ready = True
+            
+            self.logger.info(
+                f"✅ In-memory indexes loaded with {loaded:,} files "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error loading in-memory indexes: {e}", exc_info=True)
+            return False
+    
+    async def refresh_search_plan(self) -> SearchPlan:
+        """Re-read index metadata and replace the cached search plan"""
+        try:
+            indexes = await self.files.index_information()
+            self.search_plan = SearchPlan(indexes)
+            self.logger.info(f"✅ Search plan refreshed: {self.search_plan.describe()['strategies']}")
+        except Exception as e:
+            self.logger.error(f"❌ Error refreshing search plan: {e}")
+        return self.search_plan
+    
+    async def _refresh_search_plan_periodically(self):
+        """Keep the search plan current without touching the query path"""
+        while True:
+            await asyncio.sleep(Config.SEARCH_PLAN_REFRESH_INTERVAL)
+            await self.refresh_search_plan()
+    
+    async def refresh_popularity(self) -> int:
+        """Recompute the stored popularity of every file from downloads and recency
+        
+        popularity = downloads weight * ln(1 + downloads) / ln(1 + max downloads)
+                     + recency weight * 0.5 ^ (age / half-life)
+        
+        Scores are computed by one aggregation over the collection, but only
+        files whose score moved by more than POPULARITY_MIN_CHANGE are written
+        back, and only the cached results those files can appear in are dropped.
+        Old, rarely downloaded files have settled scores and cost no write.
+        """
+        try:
+            started = time.monotonic()
+            top = await self.files.aggregate(
+                [{"$group": {"_id": None, "downloads": {"$max": "$downloads"}}}]
+            ).to_list(length=1)
+            max_downloads = (top[0]["downloads"] or 0) if top else 0
+            now = datetime.utcnow()
+            half_life_ms = Config.RANK_RECENCY_HALF_LIFE_DAYS * 86400 * 1000
+            
+            downloads = {"$divide": [
+                {"$ln": {"$add": [{"$max": [{"$ifNull": ["$downloads", 0]}, 0]}, 1]}},
+                math.log1p(max(max_downloads, 0)) or 1.0
+            ]}
+            recency = {"$pow": [0.5, {"$divide": [
+                {"$max": [{"$subtract": [now, {"$ifNull": ["$date_added", now]}]}, 0]},
+                half_life_ms
+            ]}]}
+            changed = self.files.aggregate([
+                {"$project": {"file_id": 1, "tokens": 1, "popularity": 1, "score": {"$add": [
+                    {"$multiply": [Config.RANK_DOWNLOADS_WEIGHT, downloads]},
+                    {"$multiply": [Config.RANK_RECENCY_WEIGHT, recency]}
+                ]}}},
+                {"$match": {"$expr": {"$gt": [
+                    {"$abs": {"$subtract": ["$score", {"$ifNull": ["$popularity", -1]}]}},
+                    Config.POPULARITY_MIN_CHANGE
+                ]}}},
+                {"$project": {"file_id": 1, "tokens": 1, "score": 1}}
+            ], batchSize=Config.INDEX_LOAD_BATCH_SIZE)
             
-            return await cursor.to_list(length=limit)
+            updated = 0
+            batch = []
+            async for file in changed:
+                batch.append(UpdateOne({"_id": file["_id"]}, {"$set": {"popularity": file["score"]}}))
+                # Mirror the new score into memory and drop results ranked with the old one
+                if self.search_index is not None:
+                    self.search_index.update_fields(file["file_id"], {"popularity": file["score"]})
+                if self.query_cache is not None:
+                    self.query_cache.invalidate_tokens(file.get("tokens") or [])
+                if len(batch) >= Config.INDEX_LOAD_BATCH_SIZE:
+                    await self.files.bulk_write(batch, ordered=False)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                await self.files.bulk_write(batch, ordered=False)
+                updated += len(batch)
+            
+            self.logger.info(
+                f"✅ Popularity refreshed for {updated:,} changed files "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+            return updated
+        except Exception as e:
+            self.logger.error(f"❌ Error refreshing popularity scores: {e}", exc_info=True)
+            return 0
+    
+    async def _refresh_popularity_periodically(self):
+        """Recompute popularity on a fixed interval, off the query path"""
+        while True:
+            await self.refresh_popularity()
+            await asyncio.sleep(Config.POPULARITY_REFRESH_INTERVAL)
+    
+    async def search_files(self, query: str, limit: int = 10, filters: Optional[Dict] = None) -> List[Dict]:
+        """Search for files in the database
+        
+        Filter syntax and qualifiers in the query (e.g. ``1080p``, ``size>1gb``)
+        are turned into indexed predicates and merged with ``filters``.
+        """
+        try:
+            text, parsed_filters = parse_search_query(query)
+            # Detected qualifiers searched as plain text, for files whose names didn't parse them
+            plain_text, plain_filters = parse_search_query(query, detect_qualifiers=False)
+            plain = (plain_text, {**plain_filters, **(filters or {})})
+            filters = {**parsed_filters, **(filters or {})}
+            tokens = tokenize(text)
+            cache_key = QueryCache.make_key(tokens, limit, repr(sorted(filters.items())))
+            if self.query_cache is not None:
+                cached = self.query_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            results = await self.search_flight.do(
+                cache_key, lambda: self._run_search(text, tokens, limit, filters, cache_key, plain)
+            )
+            self._remember_files(results)
+            return list(results)
         except Exception as e:
             self.logger.error(f"❌ Error searching files: {e}")
             return []
     
+    async def _run_search(self, query: str, tokens: List[str], limit: int, filters: Dict, cache_key,
+                          plain: Optional[Tuple[str, Dict]] = None) -> List[Dict]:
+        """Execute a search and cache the results
+        
+        When nothing matches, the search is retried with detected qualifiers
+        as plain text (``plain``), then with typo corrections.
+        """
+        results = await self._execute_search(query, tokens, limit, filters)
+        
+        search_query, search_filters = query, filters
+        if not results and plain is not None and plain != (query, filters):
+            search_query, search_filters = plain
+            results = await self._execute_search(search_query, tokenize(search_query), limit, search_filters)
+        
+        if not results and tokens and self.fuzzy_matcher is not None and self.fuzzy_matcher.ready:
+            rewritten = self.fuzzy_matcher.rewrite(search_query)
+            if rewritten:
+                self.logger.info(f"🔤 No results for '{search_query}', retrying as '{rewritten}'")
+                results = await self._execute_search(rewritten, tokenize(rewritten), limit, search_filters)
+        
+        if self.query_cache is not None:
+            self.query_cache.set(cache_key, tokens, results)
+        return results
+    
+    async def _execute_search(self, query: str, tokens: List[str], limit: int, filters: Dict) -> List[Dict]:
+        """Run one search against the in-memory index or Mongo"""
+        # Serve from memory once the index is warm
+        if tokens and self.search_index is not None and self.search_index.ready:
+            return self.search_index.search(query, limit, filters)
+        
+        if not tokens:
+            return await self._fetch_page(None, "", filters, None, limit) if filters else []
+        
+        # The best indexed strategy only, falling through to weaker ones multiplies misses
+        return await self._fetch_page(self.search_plan.best, query, filters, None, limit)
+    
+    def _page_pipeline(self, strategy: Optional[str], query: str, filters: Dict,
+                       after: Optional[Dict], limit: int) -> List[Dict]:
+        """Aggregation that ranks matches by (score desc, _id asc) and seeks past a cursor
+        
+        Only the text strategy has a relevance score, which is blended with
+        the stored popularity the same way as ``blend_score``; the other
+        strategies match without relevance and rank by popularity alone.
+        """
+        # Files added since the last refresh count as brand new with no downloads
+        popularity = {"$ifNull": ["$popularity", Config.RANK_RECENCY_WEIGHT]}
+        score = popularity
+        if strategy == SearchPlan.TEXT:
+            match = {"$text": {"$search": query}}
+            score = {"$let": {
+                "vars": {"relevance": {"$meta": "textScore"}},
+                "in": {"$add": [
+                    {"$multiply": [
+                        Config.RANK_TEXT_WEIGHT,
+                        {"$divide": ["$$relevance", {"$add": ["$$relevance", 1]}]}
+                    ]},
+                    popularity
+                ]}
+            }}
+        elif strategy == SearchPlan.TOKENS:
+            match = {"tokens": {"$all": tokenize(query)}}
+        elif strategy == SearchPlan.PREFIX:
+            # The index range narrows on the first word, the pattern checks the rest across separators
+            tokens = tokenize(query)
+            match = {"$and": [
+                {"file_name": {"$gte": tokens[0], "$lt": tokens[0] + "\uffff"}},
+                {"file_name": {"$regex": "^" + r"[\W_]+".join(map(re.escape, tokens)), "$options": "i"}}
+            ]}
+        elif strategy == SearchPlan.REGEX:
+            match = {"file_name": {"$regex": r"[\W_]+".join(map(re.escape, tokenize(query))), "$options": "i"}}
+        else:
+            # Filter-only search
+            match = {}
+        
+        pipeline = [{"$match": {**match, **filters}}, {"$addFields": {"score": score}}]
+        if after is not None:
+            pipeline.append({"$match": {"$or": [
+                {"score": {"$lt": after["score"]}},
+                {"score": after["score"], "_id": {"$gt": after["id"]}}
+            ]}})
+        pipeline += [{"$sort": {"score": -1, "_id": 1}}, {"$limit": limit}]
+        return pipeline
+    
+    async def _fetch_page(self, strategy: Optional[str], query: str, filters: Dict,
+                          after: Optional[Dict], limit: int) -> List[Dict]:
+        """Fetch one page of results for a single strategy"""
+        if strategy == "memory":
+            seek = (after["score"], after["id"]) if after is not None else None
+            return self.search_index.search(query, limit, filters, after=seek)
+        
+        pipeline = self._page_pipeline(strategy, query, filters, after, limit)
+        options = {}
+        if strategy == SearchPlan.PREFIX:
+            options["collation"] = PREFIX_COLLATION
+        if not filters:
+            # Pin the plan's index, extra filter predicates may prefer a compound one
+            if strategy == SearchPlan.TOKENS:
+                options["hint"] = self.search_plan.tokens_index
+            elif strategy == SearchPlan.PREFIX:
+                options["hint"] = self.search_plan.prefix_index
+        return await self.files.aggregate(pipeline, **options).to_list(length=limit)
+    
+    async def search_files_page(self, query: str, limit: int = 10,
+                                after: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """Fetch one page of search results with keyset pagination
+        
+        Returns the page and a cursor for the next page (None on the last
+        page). Pass the cursor back as ``after`` to seek past the previous
+        page on (score, id) instead of skipping documents. The first page
+        goes through the result cache and identical concurrent searches
+        share one backend call, like ``search_files``.
+        """
+        try:
+            if after is not None:
+                text, filters, strategy = after["query"], after["filters"], after["strategy"]
+                results = await self._fetch_page(strategy, text, filters, after, limit + 1)
+                results, cursor = self._page_with_cursor(results, limit, text, filters, strategy)
+                self._remember_files(results)
+                return results, cursor
+            
+            text, filters = parse_search_query(query)
+            tokens = tokenize(text)
+            if not tokens and not filters:
+                return [], None
+            cache_key = QueryCache.make_key(tokens, limit, repr(sorted(filters.items())), "page")
+            page = self.query_cache.get(cache_key) if self.query_cache is not None else None
+            if page is None:
+                page = await self.search_flight.do(
+                    cache_key, lambda: self._run_first_page(query, text, tokens, filters, limit, cache_key)
+                )
+            results, cursor = page
+            self._remember_files(results)
+            return list(results), cursor
+        except Exception as e:
+            self.logger.error(f"❌ Error fetching search page: {e}")
+            return [], None
+    
+    async def _run_first_page(self, query: str, text: str, tokens: List[str], filters: Dict,
+                              limit: int, cache_key) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """Fetch the first page with the qualifier and typo retries, and cache it"""
+        strategy = self._page_strategy(tokens)
+        results = await self._fetch_page(strategy, text, filters, None, limit + 1)
+        
+        # Detected qualifiers may not be parsed on every file, retry them as plain text
+        search_text, search_filters = text, filters
+        if not results:
+            plain_text, plain_filters = parse_search_query(query, detect_qualifiers=False)
+            if (plain_text, plain_filters) != (text, filters):
+                search_text, search_filters = plain_text, plain_filters
+                strategy = self._page_strategy(tokenize(search_text))
+                results = await self._fetch_page(strategy, search_text, search_filters, None, limit + 1)
+        
+        # Retry with typo corrections when nothing matched
+        if not results and self.fuzzy_matcher is not None and self.fuzzy_matcher.ready:
+            rewritten = self.fuzzy_matcher.rewrite(search_text)
+            if rewritten:
+                search_text = rewritten
+                results = await self._fetch_page(strategy, search_text, search_filters, None, limit + 1)
+        
+        page = self._page_with_cursor(results, limit, search_text, search_filters, strategy)
+        if self.query_cache is not None:
+            self.query_cache.set(cache_key, tokens, page)
+        return page
+    
+    @staticmethod
+    def _page_with_cursor(results: List[Dict], limit: int, text: str, filters: Dict,
+                          strategy: Optional[str]) -> Tuple[List[Dict], Optional[Dict[str, Any]]]:
+        """Trim a limit + 1 fetch to one page and build the cursor of the next page"""
+        cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            cursor = {
+                "query": text,
+                "filters": filters,
+                "strategy": strategy,
+                "score": last["score"],
+                "id": last["file_id"] if strategy == "memory" else last["_id"]
+            }
+        return results, cursor
+    
+    def _page_strategy(self, tokens: List[str]) -> Optional[str]:
+        """Strategy for the first page of a paginated search"""
+        if not tokens:
+            return None
+        if self.search_index is not None and self.search_index.ready:
+            return "memory"
+        return self.search_plan.best
+    
+    async def autocomplete(self, query: str, limit: int = 50) -> List[Dict]:
+        """Prefix-match file names from memory, most downloaded first"""
+        if self.autocomplete_index is None or not self.autocomplete_index.ready:
+            return []
+        results = self.autocomplete_index.complete(query, limit)
+        self._remember_files(results)
+        return results
+    
+    def _remember_files(self, files: List[Dict]):
+        """Keep the delivery fields of listed files in the hot file cache"""
+        if self.file_cache is None:
+            return
+        for file in files:
+            key = file.get("short_id") or file.get("file_id")
+            if key:
+                self.file_cache.set(key, {field: file.get(field) for field in FILE_CACHE_FIELDS})
+    
+    async def get_file(self, file_id: Optional[str] = None, short_id: Optional[str] = None) -> Optional[Dict]:
+        """Get the delivery fields of a file by short id or file_id, from memory when it was listed recently"""
+        key = short_id or file_id
+        if self.file_cache is not None:
+            cached = self.file_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            file = None
+            if short_id is None and self.search_index is not None:
+                file = self.search_index.get(file_id)
+            if file is None:
+                # short_id and file_id are both indexed, a miss is a single index lookup
+                file = await self.files.find_one(
+                    {"short_id": short_id} if short_id else {"file_id": file_id},
+                    {field: 1 for field in FILE_CACHE_FIELDS}
+                )
+            if file is None:
+                return None
+            file = {field: file.get(field) for field in FILE_CACHE_FIELDS}
+            if self.file_cache is not None:
+                self.file_cache.set(key, file)
+            return file
+        except Exception as e:
+            self.logger.error(f"❌ Error getting file {key}: {e}")
+            return None
+    
+    async def increment_downloads(self, file_id: str, count: int = 1, user_id: Optional[int] = None) -> bool:
+        """Increase the download counter of a file, written back by the download counter"""
+        try:
+            self.download_counter.add(file_id, count)
+            for _ in range(count):
+                self.analytics.download(file_id, user_id)
+            if self.autocomplete_index is not None:
+                self.autocomplete_index.bump(file_id, count)
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error updating downloads for {file_id}: {e}")
+            return False
+    
+    def record_search(self, query: str, user_id: Optional[int], results: int):
+        """Record a search for the analytics rollups"""
+        self.analytics.search(normalize_text(query), user_id, results)
+    
+    async def flush_downloads(self) -> int:
+        """Write buffered download counts now, returns the number of files updated"""
+        return await self.download_counter.flush()
+    
+    def _run_in_background(self, coroutine):
+        """Start a one-off task and keep a reference to it until it finishes"""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    async def close(self):
+        """Stop background tasks and write anything still buffered"""
+        for task in (self._plan_task, self._popularity_task, self._stats_task, self._bans_task,
+                     *self._background_tasks):
+            if task is not None:
+                task.cancel()
+        self._plan_task = self._popularity_task = self._stats_task = self._bans_task = None
+        await self.download_counter.stop()
+        await self.analytics.stop()
+        self.logger.info("✅ Database buffers flushed")
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool utilization, to size MONGO_MAX_POOL_SIZE against the worker count"""
+        return self.pool_metrics.stats()
+    
+    # Indexing checkpoint methods
+    async def get_index_checkpoint(self, chat_id: int) -> Optional[Dict]:
+        """Get the saved indexing progress of a channel"""
+        try:
+            return await self.index_checkpoints.find_one({"chat_id": chat_id})
+        except Exception as e:
+            self.logger.error(f"❌ Error getting index checkpoint for {chat_id}: {e}")
+            return None
+    
+    async def save_index_checkpoint(self, chat_id: int, last_message_id: int, messages: int,
+                                    files: int, status: str) -> bool:
+        """Save the indexing progress of a channel"""
+        try:
+            await self.index_checkpoints.update_one(
+                {"chat_id": chat_id},
+                {"$set": {
+                    "chat_id": chat_id,
+                    "last_message_id": last_message_id,
+                    "messages": messages,
+                    "files": files,
+                    "status": status,
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error saving index checkpoint for {chat_id}: {e}")
+            return False
+    
+    async def delete_index_checkpoint(self, chat_id: int) -> bool:
+        """Forget the indexing progress of a channel"""
+        try:
+            await self.index_checkpoints.delete_one({"chat_id": chat_id})
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error deleting index checkpoint for {chat_id}: {e}")
+            return False
+    
     # Chat-related methods
     async def add_chat(self, chat_id: int, chat_type: str, title: str = "") -> bool:
         """Add a chat to the database"""
@@ -175,7 +1147,9 @@ class Database:
                 "title": title,
                 "date_added": datetime.utcnow()
             }
-            await self.chats.update_one({"chat_id": chat_id}, {"$set": chat}, upsert=True)
+            result = await self.chats.update_one({"chat_id": chat_id}, {"$set": chat}, upsert=True)
+            if result.upserted_id is not None:
+                self.stats.chat_added()
             self.logger.info(f"✅ Chat {chat_id} added/updated in database")
             return True
         except Exception as e:
@@ -183,25 +1157,47 @@ class Database:
             return False
     
     # Stats methods
-    async def get_stats(self) -> Dict[str, int]:
-        """Get bot statistics"""
+    async def reconcile_stats(self, full: bool = True) -> bool:
+        """Re-read the counters from Mongo, with the per-type breakdown when full is set
+        
+        Totals come from collection metadata (estimated_document_count), the
+        breakdown needs one aggregation over the files and runs in the background.
+        """
         try:
-            total_users = await self.users.count_documents({})
-            total_files = await self.files.count_documents({})
-            total_chats = await self.chats.count_documents({})
+            users, files, chats = await asyncio.gather(
+                self.users.estimated_document_count(),
+                self.files.estimated_document_count(),
+                self.chats.estimated_document_count()
+            )
+            self.stats.reconcile_counts(users, files, chats)
             
-            return {
-                "total_users": total_users,
-                "total_files": total_files,
-                "total_chats": total_chats
-            }
+            if full:
+                by_type = {}
+                async for row in self.files.aggregate([
+                    {"$group": {"_id": "$file_type", "count": {"$sum": 1}, "bytes": {"$sum": "$file_size"}}}
+                ]):
+                    by_type[row["_id"] or "unknown"] = (row["count"], row["bytes"])
+                self.stats.reconcile_files(by_type)
+            return True
         except Exception as e:
-            self.logger.error(f"❌ Error getting stats: {e}")
-            return {
-                "total_users": 0,
-                "total_files": 0,
-                "total_chats": 0
-            }
+            self.logger.error(f"❌ Error reconciling stats: {e}")
+            return False
+    
+    async def _reconcile_stats_periodically(self):
+        """Fully reconcile the counters on a fixed interval"""
+        while True:
+            await self.reconcile_stats()
+            await asyncio.sleep(Config.STATS_RECONCILE_INTERVAL)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get bot statistics from the in-memory counters
+        
+        Totals older than STATS_MAX_AGE seconds are re-read from collection
+        metadata first; concurrent callers share that one refresh.
+        """
+        if self.stats.age > Config.STATS_MAX_AGE:
+            await self._stats_flight.do("stats", lambda: self.reconcile_stats(full=False))
+        return self.stats.snapshot()
 
-# Initialize database
+# Process-wide database handle, import this instead of creating another Database
 db = Database(Config.MONGO_DB_URI)
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Any, Dict
+from pymongo import monitoring
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool utilization counters fed by pymongo's pool events
+
+    Motor checks connections out on its executor threads, so the counters
+    are guarded by a lock and wait times are measured per thread.
+    """
+
+    def __init__(self, max_pool_size: int):
+        """Initialize empty counters for a pool of at most max_pool_size connections"""
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting = max(self.waiting - 1, 0)
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        waited = time.monotonic() - started if started is not None else 0.0
+        with self._lock:
+            self.waiting = max(self.waiting - 1, 0)
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size, utilization and checkout wait times"""
+        with self._lock:
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": self.in_use / self.max_pool_size if self.max_pool_size else 0.0,
+                "waiting": self.waiting,
+                "peak_waiting": self.peak_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "avg_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000
+            }
@@ -0,0 +1,104 @@
+import logging
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.cache import TTLCache
+
+class LocalRateLimiter:
+    """Per-key token buckets in process memory
+
+    A bucket idle long enough to refill completely is indistinguishable
+    from a new one, so buckets expire after burst / rate seconds and the
+    LRU bound only ever drops full buckets under normal load.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        """Allow rate requests per second per key, with bursts of up to burst requests"""
+        self.rate = rate
+        self.burst = burst
+        self.limited = 0
+        self._buckets = TTLCache(max_keys, ttl=burst / rate)
+
+    async def allow(self, key: str) -> bool:
+        """Take one token from a key's bucket, False when it is empty"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.limited += 1
+        self._buckets.set(key, (tokens, now))
+        return allowed
+
+    async def refund(self, key: str):
+        """Give back a token taken by allow"""
+        tokens, updated = self._buckets.get(key, (self.burst, time.monotonic()))
+        self._buckets.set(key, (min(self.burst, tokens + 1), updated))
+
+class MongoRateLimiter:
+    """Per-key token buckets shared by every bot process through one collection
+
+    Each check is a single atomic pipeline update, so concurrent processes
+    never double-spend a token. Errors fail open: a Mongo hiccup must not
+    lock every user out.
+    """
+
+    def __init__(self, collection, rate: float, burst: int):
+        """Allow rate requests per second per key, with bursts of up to burst requests"""
+        self.collection = collection
+        self.rate = rate
+        self.burst = burst
+        self.limited = 0
+        self.logger = logging.getLogger(__name__)
+        # Full buckets carry no information, let the TTL index drop them
+        self._ttl = timedelta(seconds=burst / rate + 60)
+
+    async def allow(self, key: str) -> bool:
+        """Take one token from a key's bucket, False when it is empty"""
+        now = datetime.utcnow()
+        try:
+            bucket = await self.collection.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": {"$min": [self.burst, {"$add": [
+                        {"$ifNull": ["$tokens", self.burst]},
+                        {"$multiply": [
+                            {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]},
+                            self.rate
+                        ]}
+                    ]}]}}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {
+                        "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                        "updated_at": now,
+                        "expires_at": now + self._ttl
+                    }}
+                ],
+                projection={"allowed": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            self.logger.error(f"❌ Rate limit check failed for {key}: {e}")
+            return True
+        if not bucket["allowed"]:
+            self.limited += 1
+        return bucket["allowed"]
+
+    async def refund(self, key: str):
+        """Give back a token taken by allow"""
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                [{"$set": {"tokens": {"$min": [self.burst, {"$add": ["$tokens", 1]}]}}}]
+            )
+        except Exception as e:
+            self.logger.error(f"❌ Rate limit refund failed for {key}: {e}")
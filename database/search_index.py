@@ -0,0 +1,228 @@
+import heapq
+import logging
+import math
+import sys
+import os
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import tokenize
+
+# Fields kept in memory for every indexed file
+INDEXED_FIELDS = {
+    "_id": 1,
+    "file_id": 1,
+    "file_name": 1,
+    "file_type": 1,
+    "file_size": 1,
+    "mime_type": 1,
+    "chat_id": 1,
+    "date_added": 1,
+    "downloads": 1,
+    "tokens": 1,
+    "title": 1,
+    "year": 1,
+    "resolution": 1,
+    "codec": 1,
+    "source": 1,
+    "languages": 1,
+    "season": 1,
+    "episode": 1,
+    "popularity": 1,
+    "short_id": 1
+}
+
+def matches_filters(file: Dict, filters: Dict[str, Any]) -> bool:
+    """Evaluate Mongo-style equality and range filters against a stored file"""
+    for field, condition in filters.items():
+        value = file.get(field)
+        if isinstance(condition, dict):
+            if value is None:
+                return False
+            for operator, bound in condition.items():
+                if operator == "$gt" and not value > bound or \
+                        operator == "$gte" and not value >= bound or \
+                        operator == "$lt" and not value < bound or \
+                        operator == "$lte" and not value <= bound:
+                    return False
+        elif isinstance(value, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def blend_score(relevance: float, popularity: float, text_weight: float) -> float:
+    """Combine an unbounded text relevance score with a file's precomputed popularity
+
+    Relevance is squashed into [0, 1) so the same weights work for BM25 and
+    Mongo's textScore, and a page boundary's score is stable across requests.
+    """
+    return text_weight * relevance / (relevance + 1) + popularity
+
+class SearchIndex:
+    """In-memory inverted index over file names with BM25 ranking"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, text_weight: float = 1.0,
+                 default_popularity: float = 0.0):
+        """Initialize an empty index; files without a popularity score use default_popularity"""
+        self.k1 = k1
+        self.b = b
+        self.text_weight = text_weight
+        self.default_popularity = default_popularity
+        self.ready = False
+        self.logger = logging.getLogger(__name__)
+
+        # file_id -> internal document number
+        self._doc_numbers: Dict[str, int] = {}
+        # internal document number -> stored file fields (None once removed)
+        self._docs: List[Optional[Dict]] = []
+        self._doc_tokens: List[Optional[List[str]]] = []
+        self._doc_lengths = array("I")
+        self._total_length = 0
+        self._live_docs = 0
+
+        # token -> sorted document numbers, with parallel term frequencies
+        self._postings: Dict[str, array] = {}
+        self._frequencies: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    def add(self, file: Dict):
+        """Add or replace a file in the index"""
+        file_id = file.get("file_id")
+        if not file_id:
+            return
+
+        # Tokens already live in the posting lists, don't keep a second copy
+        stored = {field: file[field] for field in INDEXED_FIELDS if field in file and field != "tokens"}
+        tokens = file.get("tokens") or tokenize(file.get("file_name", ""))
+
+        doc = self._doc_numbers.get(file_id)
+        if doc is not None:
+            # Keep fields that the update did not carry (e.g. _id, downloads)
+            previous = self._docs[doc]
+            stored = {**previous, **stored}
+            if self._doc_tokens[doc] == tokens:
+                self._docs[doc] = stored
+                return
+            self._unlink(doc)
+        else:
+            doc = len(self._docs)
+            self._doc_numbers[file_id] = doc
+            self._docs.append(None)
+            self._doc_tokens.append(None)
+            self._doc_lengths.append(0)
+
+        self._docs[doc] = stored
+        self._doc_tokens[doc] = tokens
+        self._doc_lengths[doc] = len(tokens)
+        self._total_length += len(tokens)
+        self._live_docs += 1
+
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        for token, count in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = array("I", [doc])
+                self._frequencies[token] = array("H", [min(count, 0xFFFF)])
+                continue
+
+            # New documents always sort last, re-added ones are inserted in place
+            position = len(postings) if postings[-1] < doc else bisect_left(postings, doc)
+            postings.insert(position, doc)
+            self._frequencies[token].insert(position, min(count, 0xFFFF))
+
+    def remove(self, file_id: str):
+        """Remove a file from the index"""
+        doc = self._doc_numbers.pop(file_id, None)
+        if doc is not None:
+            self._unlink(doc)
+            self._docs[doc] = None
+            self._doc_tokens[doc] = None
+
+    def _unlink(self, doc: int):
+        """Remove a document number from every posting list it appears in"""
+        tokens = self._doc_tokens[doc] or []
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            position = bisect_left(postings, doc)
+            if position < len(postings) and postings[position] == doc:
+                del postings[position]
+                del self._frequencies[token][position]
+            if not postings:
+                del self._postings[token]
+                del self._frequencies[token]
+
+        self._total_length -= self._doc_lengths[doc]
+        self._doc_lengths[doc] = 0
+        self._live_docs -= 1
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        """Get the stored fields of an indexed file"""
+        doc = self._doc_numbers.get(file_id)
+        return self._docs[doc] if doc is not None else None
+
+    def update_fields(self, file_id: str, fields: Dict[str, Any]):
+        """Update stored fields of an indexed file that do not affect its tokens"""
+        doc = self._doc_numbers.get(file_id)
+        if doc is not None:
+            self._docs[doc].update(fields)
+
+    def score(self, query: str) -> Dict[int, float]:
+        """Compute BM25 scores for every document matching at least one query token"""
+        scores: Dict[int, float] = {}
+        if not self._live_docs:
+            return scores
+
+        average_length = self._total_length / self._live_docs or 1.0
+        k1, b = self.k1, self.b
+
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (self._live_docs - df + 0.5) / (df + 0.5))
+            frequencies = self._frequencies[token]
+            lengths = self._doc_lengths
+
+            for doc, tf in zip(postings, frequencies):
+                norm = k1 * (1 - b + b * lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return scores
+
+    def search(self, query: str, limit: int = 10, filters: Optional[Dict[str, Any]] = None,
+               after: Optional[Tuple[float, str]] = None) -> List[Dict]:
+        """Return the best matching files for a query, highest score first
+
+        The score blends BM25 relevance with the file's popularity. Results
+        are ordered by (score desc, file_id asc); ``after`` is the
+        (score, file_id) of the last result of the previous page.
+        """
+        scores = self.score(query)
+        docs = self._docs
+        candidates = []
+        for doc, relevance in scores.items():
+            file = docs[doc]
+            if filters and not matches_filters(file, filters):
+                continue
+            popularity = file.get("popularity", self.default_popularity)
+            candidates.append((-blend_score(relevance, popularity, self.text_weight), file["file_id"], doc))
+        if after is not None:
+            seek = (-after[0], after[1])
+            candidates = [candidate for candidate in candidates if candidate[:2] > seek]
+        best = heapq.nsmallest(limit, candidates)
+        return [{**docs[doc], "score": -score} for score, _, doc in best]
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+class StatsCounters:
+    """Bot statistics kept current by the write path and reconciled with Mongo now and then"""
+
+    def __init__(self):
+        """Initialize empty counters"""
+        self.users = 0
+        self.files = 0
+        self.chats = 0
+        self.total_bytes = 0
+        self.files_by_type: Dict[str, int] = {}
+        # Monotonic time of the last collection count reconciliation, 0 before the first one
+        self.counted_at = 0.0
+        # Wall time of the last full per-type reconciliation
+        self.reconciled_at: Optional[datetime] = None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the totals were last reconciled with Mongo"""
+        return time.monotonic() - self.counted_at if self.counted_at else float("inf")
+
+    def user_added(self):
+        """Count a newly inserted user"""
+        self.users += 1
+
+    def chat_added(self):
+        """Count a newly inserted chat"""
+        self.chats += 1
+
+    def file_added(self, file_type: str, file_size: int):
+        """Count a newly inserted file record"""
+        self.files += 1
+        self.total_bytes += file_size or 0
+        self.files_by_type[file_type] = self.files_by_type.get(file_type, 0) + 1
+
+    def reconcile_counts(self, users: int, files: int, chats: int):
+        """Replace the totals with counts read from Mongo"""
+        self.users, self.files, self.chats = users, files, chats
+        self.counted_at = time.monotonic()
+
+    def reconcile_files(self, by_type: Dict[str, Tuple[int, int]]):
+        """Replace the per-type breakdown with (count, bytes) per file type read from Mongo"""
+        self.files_by_type = {file_type: count for file_type, (count, _) in by_type.items()}
+        self.total_bytes = sum(size for _, size in by_type.values())
+        self.reconciled_at = datetime.utcnow()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of the current statistics"""
+        return {
+            "total_users": self.users,
+            "total_files": self.files,
+            "total_chats": self.chats,
+            "total_bytes": self.total_bytes,
+            "files_by_type": dict(self.files_by_type),
+            "age": self.age,
+            "reconciled_at": self.reconciled_at
+        }
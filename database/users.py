@@ -0,0 +1,63 @@
+import sys
+import os
+from typing import Optional, Set
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.cache import TTLCache
+
+class UserRegistry:
+    """Known users and banned ids kept in memory so interactions don't need a find_one
+
+    The LRU holds the stored profile of recent users so unchanged ones
+    skip the upsert, and the banned set is exact.
+    """
+
+    def __init__(self, cache_size: int):
+        """Initialize an empty registry"""
+        self.ready = False
+        self.skipped_writes = 0
+        self._profiles = TTLCache(cache_size)
+        self._banned: Set[int] = set()
+
+    def add(self, user: dict):
+        """Register a stored user document"""
+        user_id = user["user_id"]
+        self._profiles.set(user_id, (user.get("username"), user.get("first_name")))
+        if user.get("banned"):
+            self._banned.add(user_id)
+
+    def needs_write(self, user_id: int, username: Optional[str], first_name: Optional[str]) -> bool:
+        """Whether a user's stored profile may differ from this one"""
+        if self._profiles.get(user_id) == (username, first_name):
+            self.skipped_writes += 1
+            return False
+        return True
+
+    def remember(self, user_id: int, username: Optional[str], first_name: Optional[str]):
+        """Record a profile that was just written"""
+        self._profiles.set(user_id, (username, first_name))
+
+    def is_banned(self, user_id: int) -> bool:
+        """Exact ban check"""
+        return user_id in self._banned
+
+    def replace_banned(self, user_ids: Set[int]):
+        """Swap in the full set of banned ids, so bans and unbans made elsewhere apply"""
+        self._banned = set(user_ids)
+
+    def set_banned(self, user_id: int, banned: bool):
+        """Reflect a ban or unban"""
+        if banned:
+            self._banned.add(user_id)
+        else:
+            self._banned.discard(user_id)
+
+    def stats(self) -> dict:
+        """Registry size and cache counters"""
+        return {
+            "banned": len(self._banned),
+            "skipped_writes": self.skipped_writes,
+            "profiles": self._profiles.stats()
+        }
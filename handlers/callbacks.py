@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 import os
@@ -8,12 +9,27 @@ from pyrogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardBu
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from handlers.client import bot
+from handlers.sender import PRIORITY_DELIVERY
 from config import Config
 from handlers.commands.help import help_command
 from handlers.commands.about import about_callback
+from handlers.commands.search import search_page_callback, close_search_callback
 
 logger = logging.getLogger(__name__)
 
+async def _help_callback(client, callback_query: CallbackQuery):
+    """Show the help message"""
+    await help_command(client, callback_query.message)
+    await callback_query.answer()
+
+async def _handled_elsewhere(client, callback_query: CallbackQuery):
+    """Callbacks answered by their command module's own handler"""
+    return
+
+async def _noop_callback(client, callback_query: CallbackQuery):
+    """Buttons that only display information"""
+    await callback_query.answer()
+
 @bot.on_callback_query()
 async def handle_callbacks(client, callback_query: CallbackQuery):
     """Handle all callback queries"""
@@ -23,32 +39,14 @@ async def handle_callbacks(client, callback_query: CallbackQuery):
         
         logger.info(f"Received callback: {data} from user {user.id}")
         
-        # Route to appropriate handler based on callback data
-        if data == "help_callback":
-            await help_command(client, callback_query.message)
-            await callback_query.answer()
-            
-        elif data == "about_callback":
-            await about_callback(client, callback_query)
-            
-        elif data == "back_to_help":
-            await help_command(client, callback_query.message)
-            await callback_query.answer()
-            
-        elif data == "close_stats":
-            # Let the stats command handle its own close callback
-            return
-            
-        elif data == "refresh_stats":
-            # Let the stats command handle its own refresh callback
-            return
-            
-        elif data.startswith("file_"):
-            await handle_file_callback(client, callback_query)
-            
-        else:
+        # Route on the exact data, then on the prefix before the first underscore
+        handler = CALLBACK_ROUTES.get(data) or CALLBACK_PREFIX_ROUTES.get(data.partition("_")[0])
+        if handler is None:
             logger.warning(f"Unknown callback data: {data}")
             await callback_query.answer("❌ Unknown action", show_alert=True)
+            return
+        
+        await handler(client, callback_query)
             
     except Exception as e:
         logger.error(f"Error in callback handler: {e}", exc_info=True)
@@ -57,25 +55,45 @@ async def handle_callbacks(client, callback_query: CallbackQuery):
         except:
             pass
 
+async def _file_delivered(client, delivery: asyncio.Future, user_id: int, file_id: str):
+    """Log and count a queued file delivery once it has been sent or has failed"""
+    if delivery.cancelled():
+        return
+    error = delivery.exception()
+    if error is not None:
+        logger.error(f"Error sending file {file_id} to user {user_id}: {error}")
+        return
+    
+    # Log the download
+    logger.info(f"File sent to user {user_id}: {file_id}")
+    
+    # Update download count in database
+    await client.db.increment_downloads(file_id, user_id=user_id)
+
 async def handle_file_callback(client, callback_query: CallbackQuery):
     """Handle file download callbacks"""
     try:
-        file_id = callback_query.data.split("_", 1)[1]
+        kind, key = callback_query.data.split("_", 1)
         user = callback_query.from_user
         
-        logger.info(f"File download requested by {user.id}: {file_id}")
+        logger.info(f"File download requested by {user.id}: {key}")
         
-        # Get file info from database
-        file_data = await client.db.files.find_one({"file_id": file_id})
+        # Get file info, from the hot file cache when the file was just listed.
+        # Buttons carry the short id, "file_<file_id>" is kept for older messages
+        if kind == "f":
+            file_data = await client.db.get_file(short_id=key)
+        else:
+            file_data = await client.db.get_file(file_id=key)
         
         if not file_data:
             await callback_query.answer("❌ File not found in database.", show_alert=True)
             return
+        file_id = file_data["file_id"]
         
-        # Send the file to the user
-        try:
-            # Send the file
-            await client.send_cached_media(
+        # Queue the delivery ahead of any log traffic; a FloodWait only holds this user's chat
+        delivery = client.sender.submit(
+            user.id,
+            lambda: client.send_cached_media(
                 chat_id=user.id,
                 file_id=file_id,
                 caption=f"🎬 **{file_data.get('file_name', 'File')}**\n\n"
@@ -90,28 +108,47 @@ async def handle_file_callback(client, callback_query: CallbackQuery):
                         )
                     ]
                 ])
-            )
-            
-            # Notify user
-            await callback_query.answer("📤 File sent to your private chat!", show_alert=True)
-            
-            # Log the download
-            logger.info(f"File sent to user {user.id}: {file_id}")
-            
-            # Update download count in database
-            await client.db.files.update_one(
-                {"file_id": file_id},
-                {"$inc": {"downloads": 1}},
-                upsert=True
-            )
-            
-        except Exception as e:
-            logger.error(f"Error sending file {file_id} to user {user.id}: {e}")
+            ),
+            priority=PRIORITY_DELIVERY
+        )
+        delivery.add_done_callback(
+            lambda done: asyncio.ensure_future(_file_delivered(client, done, user.id, file_id))
+        )
+        
+        # Callback answers expire, so don't wait out a long FloodWait before replying
+        try:
+            await asyncio.wait_for(asyncio.shield(delivery), Config.FILE_DELIVERY_WAIT)
+        except asyncio.TimeoutError:
+            await callback_query.answer("⏳ Telegram is busy, your file is queued and will arrive shortly.", show_alert=True)
+            return
+        except Exception:
             await callback_query.answer(
                 "❌ Failed to send file. Please start a private chat with me and try again.",
                 show_alert=True
             )
+            return
+        
+        # Notify user
+        await callback_query.answer("📤 File sent to your private chat!", show_alert=True)
             
     except Exception as e:
         logger.error(f"Error in handle_file_callback: {e}", exc_info=True)
         await callback_query.answer("❌ An error occurred. Please try again.", show_alert=True)
+
+# Exact callback data -> handler
+CALLBACK_ROUTES = {
+    "help_callback": _help_callback,
+    "back_to_help": _help_callback,
+    "about_callback": about_callback,
+    "close_stats": _handled_elsewhere,
+    "refresh_stats": _handled_elsewhere,
+    "close_pagination": close_search_callback,
+    "noop": _noop_callback,
+}
+
+# Callback data prefix (text before the first underscore) -> handler
+CALLBACK_PREFIX_ROUTES = {
+    "f": handle_file_callback,
+    "file": handle_file_callback,
+    "search": search_page_callback,
+}
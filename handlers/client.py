@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import sys
 import os
@@ -10,14 +11,12 @@ from pyrogram.errors import BadRequest, UserNotParticipant, FloodWait
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
-from database.models import Database
+from database.models import db
+from handlers.sender import OutboundScheduler, PRIORITY_LOG
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Initialize database
-db = Database(Config.MONGO_DB_URI)
-
 class MovieBot(Client):
     """Main bot class that extends Pyrogram Client"""
     
@@ -44,6 +43,14 @@ class MovieBot(Client):
         # Store user data
         self.user_data = {}
         
+        # Background files channel indexing
+        self.index_task = None
+        
+        # Outgoing messages are scheduled by priority within Telegram's rate limits
+        self.sender = OutboundScheduler(
+            Config.SEND_GLOBAL_RATE, Config.SEND_CHAT_RATE, Config.SEND_QUEUE_SIZE, Config.SEND_MAX_FLOOD_WAIT
+        )
+        
         # Log initialization
         self.logger.info("✅ MovieBot initialized")
     
@@ -54,6 +61,9 @@ class MovieBot(Client):
         # Initialize database
         await self.db.init_db()
         
+        # Start the outbound send scheduler
+        self.sender.start()
+        
         # Get bot info
         self.bot_info = await self.get_me()
         self.bot_username = self.bot_info.username
@@ -61,10 +71,22 @@ class MovieBot(Client):
         # Log startup
         self.logger.info(f"✅ Bot started as @{self.bot_username} (ID: {self.bot_info.id})")
         self.logger.info(f"📊 Total admins: {len(self.admins)}")
+        
+        # Index the files channel in the background when AUTO_INDEX is on
+        from handlers.indexer import auto_index_files_channel
+        self.index_task = asyncio.create_task(auto_index_files_channel(self))
     
     async def stop(self, *args):
         """Stop the bot client"""
         self.logger.info("🛑 Stopping bot...")
+        # Indexing stops at its last checkpoint
+        from handlers.indexer import stop_indexing
+        if self.index_task is not None:
+            self.index_task.cancel()
+        stop_indexing()
+        # Write buffered counters before the connection goes away
+        await self.sender.stop()
+        await self.db.close()
         await super().stop()
         self.logger.info("✅ Bot stopped successfully")
     
@@ -81,25 +103,39 @@ class MovieBot(Client):
             return False
     
     async def send_log_message(self, text: str, reply_markup: InlineKeyboardMarkup = None, max_retries: int = 3):
-        """Send a log message to the log channel with retry logic"""
+        """Queue a log message for the log channel on the send scheduler
+        
+        Log posts have the lowest priority and are not awaited, so the
+        calling handler is never held up behind a busy queue or a FloodWait.
+        Other errors are retried up to max_retries attempts and logged.
+        """
         if not Config.LOG_CHANNEL_ID:
             return False
-            
-        for attempt in range(max_retries):
-            try:
-                await self.send_message(
+        
+        try:
+            delivery = self.sender.submit(
+                Config.LOG_CHANNEL_ID,
+                lambda: self.send_message(
                     chat_id=Config.LOG_CHANNEL_ID,
                     text=text[:4096],  # Telegram message length limit
                     reply_markup=reply_markup,
                     disable_web_page_preview=True
-                )
-                return True
-            except Exception as e:
-                if attempt == max_retries - 1:  # Last attempt
-                    self.logger.error(f"❌ Failed to send log message after {max_retries} attempts: {e}")
-                    return False
-                await asyncio.sleep(1)  # Wait before retry
-        return False
+                ),
+                priority=PRIORITY_LOG,
+                retries=max_retries - 1
+            )
+            delivery.add_done_callback(lambda done: self._log_message_sent(done, max_retries))
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Failed to queue log message: {e}")
+            return False
+    
+    def _log_message_sent(self, delivery: asyncio.Future, max_retries: int):
+        """Report a log post that could not be delivered"""
+        if delivery.cancelled():
+            return
+        if delivery.exception() is not None:
+            self.logger.error(f"❌ Failed to send log message after {max_retries} attempts: {delivery.exception()}")
     
     async def handle_error(self, update, context):
         """Handle errors in the bot"""
@@ -0,0 +1,84 @@
+import sys
+import os
+from datetime import datetime, timedelta
+from pyrogram import filters
+from pyrogram.types import Message
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from handlers.client import bot
+from config import Config
+from database.models import db
+from database.analytics import QUERY, ZERO_RESULT_QUERY, FILE, USER
+
+# Report window -> (rollup granularity, window length)
+ANALYTICS_WINDOWS = {
+    "hour": ("minute", timedelta(hours=1)),
+    "day": ("hour", timedelta(days=1)),
+    "week": ("hour", timedelta(days=7)),
+}
+
+# Entries listed per section
+ANALYTICS_TOP = 10
+
+def _ranked_lines(rows) -> str:
+    """Format (name, count) pairs as a numbered list"""
+    if not rows:
+        return "  _none_\n"
+    return "".join(f"  {i}. `{name}` — {count:,}\n" for i, (name, count) in enumerate(rows, 1))
+
+@bot.on_message(filters.command("analytics") & filters.private)
+async def analytics_command(client, message: Message):
+    """Handle /analytics command - search and download report from the rollups (Admin only)"""
+    # Check if user is admin
+    user = message.from_user
+    if user.id not in Config.ADMINS:
+        await message.reply_text("❌ You don't have permission to use this command.")
+        return
+
+    window = message.command[1].lower() if len(message.command) > 1 else "day"
+    if window not in ANALYTICS_WINDOWS:
+        await message.reply_text("ℹ️ Usage: `/analytics [hour|day|week]`", quote=True)
+        return
+
+    report_msg = await message.reply_text("📈 Building report...", quote=True)
+
+    try:
+        # Include the events still buffered in memory
+        await db.analytics.flush()
+
+        granularity, length = ANALYTICS_WINDOWS[window]
+        since = datetime.utcnow() - length
+        analytics = db.analytics
+        totals = await analytics.totals(granularity, since)
+        queries = await analytics.top(granularity, since, QUERY, ANALYTICS_TOP)
+        misses = await analytics.top(granularity, since, ZERO_RESULT_QUERY, ANALYTICS_TOP)
+        files = await analytics.top(granularity, since, FILE, ANALYTICS_TOP)
+        searchers = await analytics.top(granularity, since, USER, 5, field="searches")
+        downloaders = await analytics.top(granularity, since, USER, 5, field="downloads")
+
+        # Show file names instead of file ids
+        named_files = []
+        for file_id, count in files:
+            file = await db.get_file(file_id=file_id)
+            named_files.append(((file or {}).get("file_name") or file_id[:16], count))
+
+        hit_rate = 1 - totals["zero_results"] / totals["searches"] if totals["searches"] else 0.0
+        await report_msg.edit_text(
+            f"📈 **Analytics — last {window}**\n\n"
+            f"🔍 **Searches:** `{totals['searches']:,}` (hit rate `{hit_rate:.0%}`)\n"
+            f"❌ **Zero-result searches:** `{totals['zero_results']:,}`\n"
+            f"📥 **Downloads:** `{totals['downloads']:,}`\n\n"
+            f"🔥 **Top queries**\n{_ranked_lines(queries)}\n"
+            f"🕳 **Top missed queries**\n{_ranked_lines(misses)}\n"
+            f"🎬 **Top files**\n{_ranked_lines(named_files)}\n"
+            f"👤 **Top searchers**\n{_ranked_lines(searchers)}\n"
+            f"👤 **Top downloaders**\n{_ranked_lines(downloaders)}",
+            disable_web_page_preview=True
+        )
+
+    except Exception as e:
+        logger = client.logger
+        logger.error(f"Error in analytics command: {e}", exc_info=True)
+        await report_msg.edit_text("❌ An error occurred while building the report. Please try again later.")
@@ -0,0 +1,45 @@
+import sys
+import os
+from pyrogram import filters
+from pyrogram.types import Message
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from handlers.client import bot
+from config import Config
+from database.models import db
+
+@bot.on_message(filters.command(["ban", "unban"]) & filters.private)
+async def ban_command(client, message: Message):
+    """Handle /ban and /unban commands - block or unblock a user (Admin only)"""
+    # Check if user is admin
+    user = message.from_user
+    if user.id not in Config.ADMINS:
+        await message.reply_text("❌ You don't have permission to use this command.")
+        return
+
+    command = message.command[0].lower()
+    try:
+        target_id = int(message.command[1])
+    except (IndexError, ValueError):
+        await message.reply_text(f"ℹ️ Usage: `/{command} user_id`", quote=True)
+        return
+
+    if command == "ban" and target_id in Config.ADMINS:
+        await message.reply_text("❌ Admins can't be banned.", quote=True)
+        return
+
+    banned = command == "ban"
+    if not await db.set_user_banned(target_id, banned):
+        await message.reply_text("❌ Failed to update the user. Please try again later.", quote=True)
+        return
+
+    await message.reply_text(
+        f"🚫 User `{target_id}` banned." if banned else f"✅ User `{target_id}` unbanned.",
+        quote=True
+    )
+
+    # Log ban change
+    logger = client.logger
+    logger.info(f"🚫 Admin {user.id} {'banned' if banned else 'unbanned'} user {target_id}")
@@ -17,7 +17,8 @@ async def help_command(client, message: Message):
         "🔍 **How to search:**\n"
         "• Simply type the name of the movie you're looking for\n"
         "• Use specific keywords for better results\n"
-        "• Example: `Avengers: Endgame 1080p`\n\n"
+        "• Example: `Avengers: Endgame 1080p`\n"
+        "• Filters: `year:2019` `res:1080p` `type:video` `lang:hindi` `size>1gb`\n\n"
         "📋 **Available Commands:**\n"
         "• `/start` - Start the bot and see welcome message\n"
         "• `/search [query]` - Search for movies\n"
@@ -0,0 +1,78 @@
+import sys
+import os
+from pyrogram import filters
+from pyrogram.types import Message
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from handlers.client import bot
+from config import Config
+from handlers.indexer import index_jobs, start_index_job
+
+INDEX_USAGE = (
+    "📥 **Channel Indexing**\n\n"
+    "• `/index start [chat_id] [last_message_id]` - Start or resume from the checkpoint\n"
+    "• `/index restart [chat_id] [last_message_id]` - Start over from the first message\n"
+    "• `/index pause [chat_id]` - Pause indexing\n"
+    "• `/index resume [chat_id]` - Resume a paused job\n"
+    "• `/index cancel [chat_id]` - Stop indexing, keeping the checkpoint\n"
+    "• `/index status [chat_id]` - Show progress\n\n"
+    "`chat_id` defaults to the files channel. Pass the newest message id to get an ETA."
+)
+
+@bot.on_message(filters.command("index") & filters.private)
+async def index_command(client, message: Message):
+    """Handle /index command - control channel indexing (Admin only)"""
+    # Check if user is admin
+    user = message.from_user
+    if user.id not in Config.ADMINS:
+        await message.reply_text("❌ You don't have permission to use this command.")
+        return
+
+    args = message.command[1:]
+    if not args or args[0] not in ("start", "restart", "pause", "resume", "cancel", "status"):
+        await message.reply_text(INDEX_USAGE, quote=True)
+        return
+
+    action = args[0]
+    try:
+        chat_id = int(args[1]) if len(args) > 1 else Config.FILES_CHANNEL_ID
+        end_id = int(args[2]) if len(args) > 2 else None
+    except ValueError:
+        await message.reply_text("❌ Chat id and message id must be numbers.", quote=True)
+        return
+
+    if not chat_id:
+        await message.reply_text("❌ No channel given and FILES_CHANNEL_ID is not set.", quote=True)
+        return
+
+    if action in ("start", "restart"):
+        job = index_jobs.get(chat_id)
+        if job is not None and job.active:
+            await message.reply_text(job.describe(), quote=True)
+            return
+
+        progress_message = await message.reply_text("📥 Starting indexing...", quote=True)
+        await start_index_job(
+            client, chat_id, end_id=end_id, progress_message=progress_message, fresh=action == "restart"
+        )
+
+        # Log indexing start
+        logger = client.logger
+        logger.info(f"📥 Admin {user.id} started indexing {chat_id}")
+        return
+
+    job = index_jobs.get(chat_id)
+    if job is None:
+        await message.reply_text("ℹ️ No indexing job for this channel since the bot started.", quote=True)
+        return
+
+    if action == "pause":
+        job.pause()
+    elif action == "resume":
+        job.resume()
+    elif action == "cancel":
+        job.cancel()
+
+    await message.reply_text(job.describe(), quote=True)
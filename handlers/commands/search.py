@@ -1,9 +1,14 @@
+import asyncio
 import logging
 import sys
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pyrogram import filters
-from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.types import (
+    Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle,
+    InlineQueryResultCachedAudio, InlineQueryResultCachedDocument, InlineQueryResultCachedVideo,
+    InputTextMessageContent
+)
 
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -11,9 +16,30 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from handlers.client import bot
 from config import Config
 from database.models import db
+from database.cache import TTLCache
+from utils import create_pagination_buttons, file_callback_data, parse_file_size
 
 logger = logging.getLogger(__name__)
 
+# Newest inline query id per user and its running search, so older keystrokes can be dropped
+_latest_inline_queries: Dict[int, str] = {}
+_inline_search_tasks: Dict[int, asyncio.Task] = {}
+
+# Pages and cursors of recent /search results, keyed by (chat_id, message_id)
+_search_sessions = TTLCache(Config.SEARCH_SESSION_CACHE_SIZE, Config.SEARCH_SESSION_TTL)
+
+# Inline results rendered once per file and reused across queries
+_inline_results = TTLCache(Config.INLINE_RENDER_CACHE_SIZE)
+
+# Keyboard shared by every rendered inline result
+_SEARCH_AGAIN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Search Again", switch_inline_query_current_chat="")]
+])
+
+def _is_superseded(user_id: int, query_id: str) -> bool:
+    """Check whether a newer inline query from the same user has arrived"""
+    return _latest_inline_queries.get(user_id) != query_id
+
 @bot.on_message(filters.command("search") & (filters.private | filters.group))
 async def search_command(client, message: Message):
     """Handle /search command"""
@@ -40,8 +66,9 @@ async def search_command(client, message: Message):
     )
     
     try:
-        # Search for files in database
-        results = await db.search_files(query, limit=10)
+        # Fetch the first page and keep the cursor state for Prev/Next
+        results, cursor = await db.search_files_page(query, limit=Config.SEARCH_PAGE_SIZE)
+        db.record_search(query, user.id, len(results))
         
         if not results:
             # No results found
@@ -52,39 +79,14 @@ async def search_command(client, message: Message):
             )
             return
         
-        # Prepare results message
-        if len(results) == 1:
-            result_text = f"🎬 **1 result found for** `{query}`"
-        else:
-            result_text = f"🎬 **{len(results)} results found for** `{query}`"
-        
-        # Create keyboard with results
-        keyboard = []
-        
-        for i, result in enumerate(results[:10], 1):
-            # Truncate long file names
-            file_name = result['file_name']
-            if len(file_name) > 50:
-                file_name = file_name[:47] + '...'
-                
-            # Add button for each result
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{i}. {file_name}",
-                    callback_data=f"file_{result['file_id']}"
-                )
-            ])
-        
-        # Add navigation and help buttons
-        keyboard.append([
-            InlineKeyboardButton("🔍 New Search", switch_inline_query_current_chat=""),
-            InlineKeyboardButton("ℹ️ Help", callback_data="help_callback")
-        ])
+        session = {"query": query, "pages": {1: results}, "cursors": {2: cursor}}
+        _search_sessions.set((search_msg.chat.id, search_msg.id), session)
         
         # Send results
+        result_text, keyboard = _render_search_page(session, 1)
         await search_msg.edit_text(
             result_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=keyboard,
             disable_web_page_preview=True
         )
         
@@ -94,72 +96,238 @@ async def search_command(client, message: Message):
             "❌ An error occurred while searching. Please try again later."
         )
 
+def _render_search_page(session: Dict, page: int):
+    """Build the text and keyboard for one page of a search session"""
+    query = session["query"]
+    results = session["pages"][page]
+    has_next = session["cursors"].get(page + 1) is not None
+    
+    # Prepare results message
+    if page == 1 and not has_next:
+        if len(results) == 1:
+            result_text = f"🎬 **1 result found for** `{query}`"
+        else:
+            result_text = f"🎬 **{len(results)} results found for** `{query}`"
+    else:
+        result_text = f"🎬 **Results for** `{query}` **(page {page})**"
+    
+    # Create keyboard with results
+    keyboard = []
+    offset = (page - 1) * Config.SEARCH_PAGE_SIZE
+    
+    for i, result in enumerate(results, offset + 1):
+        # Truncate long file names
+        file_name = result['file_name']
+        if len(file_name) > 50:
+            file_name = file_name[:47] + '...'
+            
+        # Add button for each result
+        keyboard.append([
+            InlineKeyboardButton(
+                f"{i}. {file_name}",
+                callback_data=file_callback_data(result)
+            )
+        ])
+    
+    # Pages past the next one are unknown until reached with keyset pagination
+    if page > 1 or has_next:
+        total_pages = page + 1 if has_next else page
+        keyboard.extend(create_pagination_buttons(page, total_pages, "search").inline_keyboard)
+    
+    # Add navigation and help buttons
+    keyboard.append([
+        InlineKeyboardButton("🔍 New Search", switch_inline_query_current_chat=""),
+        InlineKeyboardButton("ℹ️ Help", callback_data="help_callback")
+    ])
+    
+    return result_text, InlineKeyboardMarkup(keyboard)
+
+async def search_page_callback(client, callback_query: CallbackQuery):
+    """Handle Prev/Next buttons of a paginated search"""
+    message = callback_query.message
+    session = _search_sessions.get((message.chat.id, message.id))
+    if session is None:
+        await callback_query.answer("⌛ This search has expired. Please search again.", show_alert=True)
+        return
+    
+    page = int(callback_query.data.rsplit("_", 1)[1])
+    if page not in session["pages"]:
+        # Seek from the stored cursor instead of re-running earlier pages
+        cursor = session["cursors"].get(page)
+        if cursor is None:
+            await callback_query.answer("❌ No more results.")
+            return
+        results, next_cursor = await db.search_files_page(
+            session["query"], limit=Config.SEARCH_PAGE_SIZE, after=cursor
+        )
+        if not results:
+            await callback_query.answer("❌ No more results.")
+            return
+        session["pages"][page] = results
+        session["cursors"][page + 1] = next_cursor
+    
+    result_text, keyboard = _render_search_page(session, page)
+    await message.edit_text(
+        result_text,
+        reply_markup=keyboard,
+        disable_web_page_preview=True
+    )
+    await callback_query.answer()
+
+async def close_search_callback(client, callback_query: CallbackQuery):
+    """Handle the close button of a paginated search"""
+    message = callback_query.message
+    _search_sessions.pop((message.chat.id, message.id))
+    await message.delete()
+    await callback_query.answer()
+
 # Inline query handler
 @bot.on_inline_query()
 async def inline_search(client, inline_query):
     """Handle inline search queries"""
     query = inline_query.query.strip()
+    user_id = inline_query.from_user.id
+    
+    # Track the newest query and cancel the search of the one it supersedes
+    _latest_inline_queries[user_id] = inline_query.id
+    previous_task = _inline_search_tasks.pop(user_id, None)
+    if previous_task is not None:
+        previous_task.cancel()
     
+    try:
+        await _answer_inline_query(inline_query, query, user_id)
+    finally:
+        if not _is_superseded(user_id, inline_query.id):
+            _latest_inline_queries.pop(user_id, None)
+
+async def _answer_inline_query(inline_query, query: str, user_id: int):
+    """Search and answer an inline query unless a newer one replaces it"""
     if not query:
         # Show help if no query
         await inline_query.answer(
             results=[],
+            cache_time=Config.INLINE_HELP_CACHE_TIME,
             switch_pm_text="🔍 Search for movies...",
             switch_pm_parameter="start"
         )
         return
     
+    # Wait out typing bursts before doing any work
+    if Config.INLINE_DEBOUNCE_MS > 0:
+        await asyncio.sleep(Config.INLINE_DEBOUNCE_MS / 1000)
+        if _is_superseded(user_id, inline_query.id):
+            return
+    
     try:
+        # Answer prefix queries from the autocomplete index, then fall back to full search
+        results = await db.autocomplete(query, limit=50)
+        if results:
+            db.record_search(query, user_id, len(results))
+            await _send_inline_results(inline_query, results, Config.INLINE_PREFIX_CACHE_TIME)
+            return
+        
         # Search for files in database
-        results = await db.search_files(query, limit=50)
+        search_task = asyncio.ensure_future(db.search_files(query, limit=50))
+        _inline_search_tasks[user_id] = search_task
+        try:
+            results = await search_task
+        except asyncio.CancelledError:
+            if _is_superseded(user_id, inline_query.id):
+                return
+            raise
+        finally:
+            if _inline_search_tasks.get(user_id) is search_task:
+                del _inline_search_tasks[user_id]
+        
+        if _is_superseded(user_id, inline_query.id):
+            return
+        db.record_search(query, user_id, len(results))
         
         if not results:
             # No results found
             await inline_query.answer(
                 results=[],
+                cache_time=Config.INLINE_EMPTY_CACHE_TIME,
                 switch_pm_text="❌ No results found. Try again!",
                 switch_pm_parameter="start"
             )
             return
         
-        # Prepare inline results
-        inline_results = []
-        
-        for result in results:
-            # Create result item
-            inline_results.append({
-                "type": "article",
-                "id": result['file_id'],
-                "title": result['file_name'],
-                "description": f"📁 {result['file_type'].upper()} • {result.get('file_size', 'N/A')}",
-                "input_message_content": {
-                    "message_text": f"🎬 **{result['file_name']}**\n\n"
-                                    f"📁 Type: {result.get('file_type', 'Unknown')}\n"
-                                    f"📦 Size: {result.get('file_size', 'N/A')}\n\n"
-                                    f"🔍 Search: `{query}`",
-                    "disable_web_page_preview": True
-                },
-                "reply_markup": InlineKeyboardMarkup([
-                    [
-                        InlineKeyboardButton(
-                            "📥 Download",
-                            callback_data=f"file_{result['file_id']}"
-                        )
-                    ]
-                ])
-            })
-        
-        # Send results
-        await inline_query.answer(
-            results=inline_results[:50],  # Max 50 results
-            cache_time=1,
-            is_personal=True
-        )
+        await _send_inline_results(inline_query, results, Config.INLINE_CACHE_TIME)
         
     except Exception as e:
         logger.error(f"Error in inline search: {e}", exc_info=True)
         await inline_query.answer(
             results=[],
+            cache_time=0,
             switch_pm_text="❌ Error in search. Try again!",
             switch_pm_parameter="start"
         )
+
+def _render_inline_result(result: dict):
+    """Build the inline result for a file, sending the cached media itself when Telegram allows it"""
+    # The id doubles as callback data, so a chosen result resolves like a button tap
+    result_id = file_callback_data(result)
+    file_type = result.get('file_type') or 'unknown'
+    size = parse_file_size(result.get('file_size') or 0)
+    caption = f"🎬 **{result['file_name']}**\n\n📁 Type: {file_type}\n📦 Size: {size}"
+    description = f"📁 {file_type.upper()} • {size}"
+    
+    if file_type == "video":
+        return InlineQueryResultCachedVideo(
+            result['file_id'], result['file_name'], id=result_id, description=description,
+            caption=caption, reply_markup=_SEARCH_AGAIN_MARKUP
+        )
+    if file_type == "audio":
+        return InlineQueryResultCachedAudio(
+            result['file_id'], id=result_id, caption=caption, reply_markup=_SEARCH_AGAIN_MARKUP
+        )
+    if file_type not in ("unknown", "photo", "voice", "video_note"):
+        # Documents are stored with their mime subtype as file_type
+        return InlineQueryResultCachedDocument(
+            result['file_id'], result['file_name'], id=result_id, description=description,
+            caption=caption, reply_markup=_SEARCH_AGAIN_MARKUP
+        )
+    return InlineQueryResultArticle(
+        result['file_name'],
+        InputTextMessageContent(caption, disable_web_page_preview=True),
+        id=result_id,
+        description=description,
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("📥 Download", callback_data=result_id)]
+        ])
+    )
+
+async def _send_inline_results(inline_query, results: List[dict], cache_time: int):
+    """Answer an inline query with the cached rendering of each file"""
+    inline_results = []
+    for result in results:
+        if len(inline_results) >= 50:  # Max 50 results
+            break
+        if not result.get('short_id'):
+            # A file_id result id can pass 64 bytes and Telegram rejects the whole answer,
+            # list the file once backfill_short_ids has reached it
+            continue
+        # Re-render when the file's listed metadata or its short id (result id, button) changes
+        key = (result['file_id'], result['short_id'], result['file_name'],
+               result.get('file_type'), result.get('file_size'))
+        rendered = _inline_results.get(key)
+        if rendered is None:
+            rendered = _render_inline_result(result)
+            _inline_results.set(key, rendered)
+        inline_results.append(rendered)
+    
+    # Results depend only on the query, so Telegram may share them between users
+    await inline_query.answer(
+        results=inline_results,
+        cache_time=cache_time,
+        is_personal=False
+    )
+
+@bot.on_chosen_inline_result()
+async def count_inline_download(client, chosen_result):
+    """Count files sent through inline mode (needs inline feedback enabled in BotFather)"""
+    kind, key = chosen_result.result_id.split("_", 1)
+    file = await db.get_file(short_id=key) if kind == "f" else await db.get_file(file_id=key)
+    if file is not None:
+        await db.increment_downloads(file["file_id"], user_id=chosen_result.from_user.id)
@@ -0,0 +1,36 @@
+import sys
+import os
+from pyrogram import filters
+from pyrogram.types import Message
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from handlers.client import bot
+from config import Config
+from database.models import db
+
+@bot.on_message(filters.command("searchplan") & (filters.private | filters.group))
+async def search_plan_command(client, message: Message):
+    """Handle /searchplan command - re-detect search indexes (Admin only)"""
+    # Check if user is admin
+    user = message.from_user
+    if user.id not in Config.ADMINS:
+        await message.reply_text("❌ You don't have permission to use this command.")
+        return
+
+    # Refresh the cached search plan
+    plan = (await db.refresh_search_plan()).describe()
+
+    await message.reply_text(
+        "🧭 **Search Plan Refreshed**\n\n"
+        f"🔑 **Tokens Index:** `{plan['tokens_index'] or 'none'}`\n"
+        f"📝 **Text Index:** `{plan['text_index'] or 'none'}`\n"
+        f"🔤 **Prefix Index:** `{plan['prefix_index'] or 'none'}`\n"
+        f"⚙️ **Strategies:** `{plan['strategies']}` (searches use the first)",
+        quote=True
+    )
+
+    # Log plan refresh
+    logger = client.logger
+    logger.info(f"🧭 Admin {user.id} refreshed the search plan")
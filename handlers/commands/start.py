@@ -15,8 +15,8 @@ async def start_command(client, message: Message):
     """Handle /start command"""
     user = message.from_user
     
-    # Add user to database
-    await db.add_user(
+    # Add user to database, returning users with an unchanged profile cost no write
+    is_new = await db.add_user(
         user_id=user.id,
         username=user.username,
         first_name=user.first_name
@@ -62,15 +62,12 @@ async def start_command(client, message: Message):
     logger.info(f"👤 User {user.id} started the bot")
     
     # Send log to admin
-    if Config.LOG_CHANNEL_ID:
+    if Config.LOG_CHANNEL_ID and is_new:
         log_text = (
             f"👤 **New User**\n"
             f"├ User: {user.mention} (`{user.id}`)\n"
             f"├ Username: @{user.username}\n"
             f"└ First Name: `{user.first_name}`"
         )
-        await client.send_message(
-            chat_id=Config.LOG_CHANNEL_ID,
-            text=log_text,
-            disable_web_page_preview=True
-        )
+        # Queued behind user-facing sends, a flooded log channel never delays the reply
+        await client.send_log_message(log_text)
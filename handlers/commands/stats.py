@@ -11,6 +11,82 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from handlers.client import bot
 from config import Config
 from database.models import db
+from utils import parse_file_size
+
+# File types listed individually in /stats, the rest are summed up
+STATS_TOP_TYPES = 8
+
+def _pool_text() -> str:
+    """Format MongoDB connection pool utilization"""
+    pool = db.get_pool_stats()
+    return (
+        f"🗄 **Mongo Pool:** `{pool['in_use']}/{pool['max_pool_size']}` in use "
+        f"(peak `{pool['peak_in_use']}`, open `{pool['open']}`)\n"
+        f"⏳ **Pool Waits:** `{pool['waiting']}` now, peak `{pool['peak_waiting']}`, "
+        f"avg `{pool['avg_wait_ms']:.1f}ms`, max `{pool['max_wait_ms']:.1f}ms`, "
+        f"failed `{pool['checkout_failures']}`"
+    )
+
+def _search_cache_text() -> str:
+    """Format the search result cache and request coalescing counters"""
+    flight = db.search_flight.stats()
+    if db.query_cache is not None:
+        cache = db.query_cache.stats()
+        cache_line = (
+            f"🧠 **Search Cache:** `{cache['size']:,}/{cache['max_size']:,}` entries, "
+            f"hit rate `{cache['hit_rate']:.0%}` (`{cache['hits']:,}` hits, `{cache['misses']:,}` misses)\n"
+        )
+    else:
+        cache_line = "🧠 **Search Cache:** `disabled`\n"
+    return (
+        f"{cache_line}"
+        f"🔗 **Coalesced Searches:** `{flight['coalesced']:,}` of `{flight['calls']:,}`, "
+        f"`{flight['in_flight']}` in flight, `{flight['abandoned']:,}` abandoned"
+    )
+
+def _sender_text(client) -> str:
+    """Format the outbound send queue depth and counters"""
+    sender = client.sender.stats()
+    depth = sender['by_priority']
+    return (
+        f"📤 **Send Queue:** `{sender['depth']}` waiting (delivery `{depth['delivery']}`, "
+        f"reply `{depth['reply']}`, log `{depth['log']}`), peak `{sender['peak_depth']}`\n"
+        f"🚦 **Sends:** `{sender['sent']:,}` sent, `{sender['failed']}` failed, `{sender['dropped']}` dropped, "
+        f"`{sender['flood_waits']}` FloodWaits, `{sender['parked_chats']}` chats parked"
+    )
+
+def _stats_text(client, stats: dict) -> str:
+    """Format the stats snapshot"""
+    # Calculate uptime
+    start_time = client.start_time
+    uptime = datetime.utcnow() - start_time
+    days, remainder = divmod(int(uptime.total_seconds()), 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, _ = divmod(remainder, 60)
+    
+    # Largest file types first
+    by_type = sorted(stats['files_by_type'].items(), key=lambda item: item[1], reverse=True)
+    type_lines = "".join(f"  • {file_type}: `{count:,}`\n" for file_type, count in by_type[:STATS_TOP_TYPES])
+    others = sum(count for _, count in by_type[STATS_TOP_TYPES:])
+    if others:
+        type_lines += f"  • other: `{others:,}`\n"
+    
+    reconciled = stats['reconciled_at'].strftime('%Y-%m-%d %H:%M:%S UTC') if stats['reconciled_at'] else "pending"
+    counted = f"{int(stats['age'])}s ago" if stats['age'] != float("inf") else "never"
+    return (
+        "🤖 **Bot Statistics**\n\n"
+        f"👥 **Total Users:** `{stats['total_users']:,}`\n"
+        f"📂 **Total Files:** `{stats['total_files']:,}`\n"
+        f"{type_lines}"
+        f"💾 **Indexed Size:** `{parse_file_size(stats['total_bytes'])}`\n"
+        f"💬 **Total Chats:** `{stats['total_chats']:,}`\n\n"
+        f"{_pool_text()}\n"
+        f"{_search_cache_text()}\n"
+        f"{_sender_text(client)}\n\n"
+        f"⏱ **Uptime:** {days}d {hours}h {minutes}m\n"
+        f"🚀 **Start Time:** `{start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC`\n\n"
+        f"_Totals counted {counted}, types recounted: {reconciled}_"
+    )
 
 @bot.on_message(filters.command("stats") & (filters.private | filters.group))
 async def stats_command(client, message: Message):
@@ -28,23 +104,8 @@ async def stats_command(client, message: Message):
         # Get stats from database
         stats = await db.get_stats()
         
-        # Calculate uptime
-        start_time = client.start_time
-        uptime = datetime.utcnow() - start_time
-        days, remainder = divmod(int(uptime.total_seconds()), 86400)
-        hours, remainder = divmod(remainder, 3600)
-        minutes, _ = divmod(remainder, 60)
-        
         # Format stats message
-        stats_text = (
-            "🤖 **Bot Statistics**\n\n"
-            f"👥 **Total Users:** `{stats['total_users']:,}`\n"
-            f"📂 **Total Files:** `{stats['total_files']:,}`\n"
-            f"💬 **Total Chats:** `{stats['total_chats']:,}`\n\n"
-            f"⏱ **Uptime:** {days}d {hours}h {minutes}m\n"
-            f"🚀 **Start Time:** `{start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC`\n\n"
-            "_Last updated: {}".format(datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"))
-        )
+        stats_text = _stats_text(client, stats)
         
         # Create keyboard
         keyboard = InlineKeyboardMarkup([
@@ -84,23 +145,8 @@ async def refresh_stats_callback(client, callback_query):
         # Get updated stats
         stats = await db.get_stats()
         
-        # Calculate uptime
-        start_time = client.start_time
-        uptime = datetime.utcnow() - start_time
-        days, remainder = divmod(int(uptime.total_seconds()), 86400)
-        hours, remainder = divmod(remainder, 3600)
-        minutes, _ = divmod(remainder, 60)
-        
         # Format stats message
-        stats_text = (
-            "🤖 **Bot Statistics**\n\n"
-            f"👥 **Total Users:** `{stats['total_users']:,}`\n"
-            f"📂 **Total Files:** `{stats['total_files']:,}`\n"
-            f"💬 **Total Chats:** `{stats['total_chats']:,}`\n\n"
-            f"⏱ **Uptime:** {days}d {hours}h {minutes}m\n"
-            f"🚀 **Start Time:** `{start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC`\n\n"
-            "_Last updated: {}".format(datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"))
-        )
+        stats_text = _stats_text(client, stats)
         
         # Update message
         await callback_query.message.edit_text(
@@ -0,0 +1,396 @@
+import asyncio
+import logging
+import sys
+import os
+import time
+from typing import Dict, List, Optional
+from pyrogram import filters
+from pyrogram.types import Message
+from pyrogram.errors import FloodWait
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.client import bot
+from config import Config
+from database.models import db
+from utils import get_media_info
+
+logger = logging.getLogger(__name__)
+
+# Telegram returns at most 200 messages per get_messages call
+HISTORY_BATCH_SIZE = 200
+
+def message_to_file(message: Message) -> Optional[Dict]:
+    """Turn a channel post into the file fields stored by the database, or None"""
+    media_info = get_media_info(message)
+    if not media_info or not media_info.get("file_id"):
+        return None
+
+    media_info["caption"] = message.caption or ""
+    media_info["chat_id"] = message.chat.id
+    return media_info
+
+class IndexJob:
+    """Resumable history indexing of one channel, checkpointed in Mongo
+
+    The job is the producer of the indexing pipeline: it fetches 200-message
+    blocks in order and hands them to the shared extraction and write stages.
+    The checkpoint only advances past a block once it and every earlier block
+    have been written, so a crash never skips messages.
+    """
+
+    RUNNING = "running"
+    PAUSED = "paused"
+    CANCELLED = "cancelled"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, client, chat_id: int, end_id: Optional[int] = None, progress_message: Message = None):
+        """Prepare a job; end_id (the newest message id) enables the ETA"""
+        self.client = client
+        self.chat_id = chat_id
+        self.end_id = end_id
+        self.progress_message = progress_message
+        self.status = self.RUNNING
+        self.start_id = 1
+        self.next_id = 1
+        self.messages = 0
+        self.files = 0
+        self.last_message_id = 0
+        self.started = time.monotonic()
+        self.session_messages = 0
+        self.session_files = 0
+        self._last_progress = 0.0
+        self._resume = asyncio.Event()
+        self._resume.set()
+        # Block start id -> done flag, for blocks handed to the pipeline
+        self._blocks: Dict[int, bool] = {}
+        # Block start id -> newest message id found in it
+        self._block_last_ids: Dict[int, int] = {}
+        self._producing = True
+        self.finished = asyncio.get_event_loop().create_future()
+        # The producer task, referenced so it is not collected and can be cancelled on shutdown
+        self.task: Optional[asyncio.Task] = None
+
+    async def load_checkpoint(self):
+        """Continue from the saved checkpoint of this channel, if any"""
+        checkpoint = await db.get_index_checkpoint(self.chat_id)
+        if checkpoint:
+            self.last_message_id = checkpoint.get("last_message_id", 0)
+            self.messages = checkpoint.get("messages", 0)
+            self.files = checkpoint.get("files", 0)
+        self.start_id = self.next_id = self.last_message_id + 1
+
+    def pause(self):
+        """Stop fetching after the current block until resumed"""
+        if self.status == self.RUNNING:
+            self.status = self.PAUSED
+            self._resume.clear()
+
+    def resume(self):
+        """Continue a paused job"""
+        if self.status == self.PAUSED:
+            self.status = self.RUNNING
+            self._resume.set()
+
+    def cancel(self):
+        """Stop the job, keeping the checkpoint for a later start"""
+        if self.active:
+            self.status = self.CANCELLED
+            self._resume.set()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (self.RUNNING, self.PAUSED)
+
+    async def _fetch(self, message_ids: List[int]) -> List[Message]:
+        """Fetch a block of messages, waiting out flood limits"""
+        while True:
+            try:
+                return await self.client.get_messages(self.chat_id, message_ids)
+            except FloodWait as e:
+                logger.warning(f"⚠️ Flood wait of {e.value}s while indexing {self.chat_id}")
+                await asyncio.sleep(e.value + 1)
+
+    async def produce(self, pipeline: "IndexPipeline"):
+        """Fetch history blocks in order until it runs out or the job stops
+
+        Bots cannot page through history, so the walk stops at end_id or after
+        INDEX_EMPTY_BATCH_LIMIT empty blocks in a row.
+        """
+        empty_batches = 0
+        logger.info(f"📥 Indexing channel {self.chat_id} from message {self.start_id}")
+
+        try:
+            while self.active:
+                if not self._resume.is_set():
+                    await self.checkpoint()
+                    await self.report(force=True)
+                    await self._resume.wait()
+                    continue
+
+                if self.end_id and self.next_id > self.end_id:
+                    break
+                if not self.end_id and empty_batches >= Config.INDEX_EMPTY_BATCH_LIMIT:
+                    break
+
+                block_start = self.next_id
+                self.next_id += HISTORY_BATCH_SIZE
+                messages = await self._fetch(list(range(block_start, self.next_id)))
+
+                found = [message for message in messages if message and not message.empty]
+                empty_batches = 0 if found else empty_batches + 1
+                self.messages += len(found)
+                self.session_messages += len(found)
+
+                # Blocks queue up to INDEX_QUEUE_SIZE, then fetching waits for the workers
+                self._blocks[block_start] = False
+                if found:
+                    self._block_last_ids[block_start] = max(message.id for message in found)
+                await pipeline.fetched.put((self, block_start, found))
+        except Exception as e:
+            self.status = self.FAILED
+            logger.error(f"❌ Error fetching history of {self.chat_id}: {e}", exc_info=True)
+
+        self._producing = False
+        await self._maybe_finish()
+
+    async def block_done(self, block_start: int, files: int, ok: bool = True):
+        """Record a processed block and advance the checkpoint past finished blocks"""
+        if not ok:
+            # A failed block pins the checkpoint before it and stops the job
+            self._blocks[block_start] = None
+            self.status = self.FAILED
+            self._resume.set()
+        else:
+            self._blocks[block_start] = True
+            self.files += files
+            self.session_files += files
+
+        advanced = False
+        for start in sorted(self._blocks):
+            if self._blocks[start] is not True:
+                break
+            del self._blocks[start]
+            # Trailing empty blocks don't move the checkpoint, new posts will land there
+            last_id = self._block_last_ids.pop(start, None)
+            if last_id is not None:
+                self.last_message_id = last_id
+                advanced = True
+
+        if advanced:
+            # Persist every advance so a crash resumes from the last written block
+            await self.checkpoint()
+            await self.report()
+        await self._maybe_finish()
+
+    async def checkpoint(self):
+        """Save progress up to the last block whose predecessors are all written"""
+        await db.save_index_checkpoint(
+            self.chat_id, self.last_message_id, self.messages, self.files, self.status
+        )
+
+    async def _maybe_finish(self):
+        """Finalize once fetching stopped and every fetched block was written"""
+        pending = any(done is False for done in self._blocks.values())
+        if self._producing or pending or self.finished.done():
+            return
+
+        if self.active:
+            self.status = self.DONE
+        await self.checkpoint()
+        logger.info(
+            f"✅ Indexing of channel {self.chat_id} {self.status}: {self.files:,} files from "
+            f"{self.messages:,} messages in {time.monotonic() - self.started:.1f}s"
+        )
+        await self.report(force=True)
+        self.finished.set_result(self)
+
+    def progress(self) -> Dict:
+        """Throughput and ETA of this run"""
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        # Ids advance faster than messages when posts were deleted, estimate by ids
+        id_rate = (self.next_id - self.start_id) / elapsed
+        eta = None
+        if self.end_id and id_rate > 0:
+            eta = max(self.end_id - self.next_id, 0) / id_rate
+        return {
+            "elapsed": elapsed,
+            "messages_per_sec": self.session_messages / elapsed,
+            "files_per_sec": self.session_files / elapsed,
+            "eta": eta
+        }
+
+    def describe(self) -> str:
+        """Progress text for the admin"""
+        progress = self.progress()
+        eta = "unknown" if progress["eta"] is None else f"{int(progress['eta'] // 60)}m {int(progress['eta'] % 60)}s"
+        target = f" / {self.end_id:,}" if self.end_id else ""
+        return (
+            f"📥 **Indexing** `{self.chat_id}` — **{self.status}**\n\n"
+            f"📨 **Message:** `{self.last_message_id:,}{target}`\n"
+            f"📂 **Files Indexed:** `{self.files:,}`\n"
+            f"💬 **Messages Seen:** `{self.messages:,}`\n"
+            f"⚡ **Speed:** `{progress['messages_per_sec']:.1f} msg/s, {progress['files_per_sec']:.1f} files/s`\n"
+            f"⏳ **ETA:** `{eta}`"
+        )
+
+    async def report(self, force: bool = False):
+        """Edit the progress message, at most once per INDEX_PROGRESS_INTERVAL"""
+        if self.progress_message is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_progress < Config.INDEX_PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        try:
+            await self.progress_message.edit_text(self.describe())
+        except FloodWait as e:
+            self._last_progress = now + e.value
+        except Exception as e:
+            logger.debug(f"Could not update indexing progress: {e}")
+
+class IndexPipeline:
+    """Shared extraction and write stages fed by one producer per channel
+
+    fetched: (job, block_start, messages) from the channel producers
+    extracted: (job, block_start, files) ready to be written in bulk
+    Both queues are bounded, so memory stays flat whatever the channel size.
+    """
+
+    def __init__(self, extract_workers: int, write_workers: int, queue_size: int):
+        """Create the bounded queues; workers start on first use"""
+        self.extract_workers = extract_workers
+        self.write_workers = write_workers
+        self.fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.extracted: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the stage workers once"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._extract()) for _ in range(self.extract_workers)]
+        self._workers += [asyncio.create_task(self._write()) for _ in range(self.write_workers)]
+
+    def stop(self):
+        """Cancel the stage workers"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def _extract(self):
+        """Turn fetched messages into file documents"""
+        while True:
+            job, block_start, messages = await self.fetched.get()
+            try:
+                files = []
+                for message in messages:
+                    # One unreadable post must not cost the rest of its block
+                    try:
+                        file = message_to_file(message)
+                    except Exception as e:
+                        logger.error(f"❌ Error extracting media from {job.chat_id}/{message.id}: {e}", exc_info=True)
+                        continue
+                    if file:
+                        files.append(file)
+                await self.extracted.put((job, block_start, files))
+            finally:
+                self.fetched.task_done()
+
+    async def _write(self):
+        """Write extracted blocks, grouping whatever is queued into one bulk write"""
+        while True:
+            blocks = [await self.extracted.get()]
+            files = list(blocks[0][2])
+            while len(files) < Config.INDEX_BULK_SIZE and not self.extracted.empty():
+                block = self.extracted.get_nowait()
+                blocks.append(block)
+                files.extend(block[2])
+
+            settled = set()
+            try:
+                written = await db.add_files_bulk(files)
+                # A partial write fails the blocks so the checkpoint stays before the missing files
+                ok = written == len(files)
+                for job, block_start, block_files in blocks:
+                    settled.add((job.chat_id, block_start))
+                    await job.block_done(block_start, len(block_files) if ok else 0, ok)
+            except Exception as e:
+                logger.error(f"❌ Error in index writer: {e}", exc_info=True)
+                # Fail the unsettled blocks so their jobs still finish instead of hanging
+                for job, block_start, _ in blocks:
+                    if (job.chat_id, block_start) not in settled:
+                        await job.block_done(block_start, 0, ok=False)
+            finally:
+                for _ in blocks:
+                    self.extracted.task_done()
+
+# Shared pipeline and active indexing jobs by channel id
+index_pipeline: Optional[IndexPipeline] = None
+index_jobs: Dict[int, IndexJob] = {}
+
+def get_index_pipeline() -> IndexPipeline:
+    """Get the shared pipeline, starting its workers on first use"""
+    global index_pipeline
+    if index_pipeline is None:
+        index_pipeline = IndexPipeline(
+            Config.INDEX_EXTRACT_WORKERS, Config.INDEX_WRITE_WORKERS, Config.INDEX_QUEUE_SIZE
+        )
+    index_pipeline.start()
+    return index_pipeline
+
+async def start_index_job(client, chat_id: int, end_id: Optional[int] = None,
+                          progress_message: Message = None, fresh: bool = False) -> IndexJob:
+    """Start (or resume from its checkpoint) the history indexing of a channel"""
+    job = index_jobs.get(chat_id)
+    if job is not None and job.active:
+        return job
+
+    if fresh:
+        await db.delete_index_checkpoint(chat_id)
+
+    job = IndexJob(client, chat_id, end_id=end_id, progress_message=progress_message)
+    await job.load_checkpoint()
+    index_jobs[chat_id] = job
+    job.task = asyncio.create_task(job.produce(get_index_pipeline()))
+    return job
+
+def stop_indexing():
+    """Cancel every indexing job and the pipeline workers, checkpoints stay at the last written block"""
+    for job in index_jobs.values():
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+    if index_pipeline is not None:
+        index_pipeline.stop()
+
+async def auto_index_files_channel(client):
+    """Index every configured channel concurrently on startup when AUTO_INDEX is enabled"""
+    if not Config.AUTO_INDEX or not Config.INDEX_CHANNEL_IDS:
+        return
+
+    try:
+        jobs = [await start_index_job(client, chat_id) for chat_id in Config.INDEX_CHANNEL_IDS]
+        await asyncio.gather(*(job.finished for job in jobs))
+    except Exception as e:
+        logger.error(f"❌ Error auto indexing channels: {e}", exc_info=True)
+
+@bot.on_message(filters.chat(Config.INDEX_CHANNEL_IDS) & filters.media)
+async def index_new_channel_post(client, message: Message):
+    """Index files posted to the indexed channels as they arrive"""
+    file = message_to_file(message)
+    if not file:
+        return
+
+    await db.add_file(
+        file_id=file["file_id"],
+        file_name=file["file_name"],
+        file_type=file["file_type"],
+        file_size=file["file_size"],
+        mime_type=file["mime_type"],
+        caption=file["caption"],
+        chat_id=file["chat_id"],
+        file_unique_id=file["file_unique_id"],
+        duration=file["duration"]
+    )
@@ -0,0 +1,102 @@
+import logging
+import sys
+import os
+from pyrogram import filters
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.client import bot
+from config import Config
+from database.models import db
+
+logger = logging.getLogger(__name__)
+
+# Pre-dispatch gate: runs before the error handlers (-1) and every command handler (0)
+MIDDLEWARE_GROUP = -2
+
+# Token buckets per user for each expensive action, and per chat for group traffic
+_user_limits = {
+    "search": db.rate_limiter(Config.RATE_LIMIT_USER_RATE, Config.RATE_LIMIT_USER_BURST),
+    "file": db.rate_limiter(Config.RATE_LIMIT_USER_RATE, Config.RATE_LIMIT_USER_BURST),
+    "inline": db.rate_limiter(Config.RATE_LIMIT_INLINE_RATE, Config.RATE_LIMIT_INLINE_BURST),
+}
+_chat_limit = db.rate_limiter(Config.RATE_LIMIT_CHAT_RATE, Config.RATE_LIMIT_CHAT_BURST)
+
+async def _allowed(action: str, user_id: int, chat_id: int = None) -> bool:
+    """Take a token from the user's bucket for an action and, for group traffic, the chat's
+
+    A request takes from both buckets or neither: when the chat is out of
+    tokens, the user's token is given back.
+    """
+    if user_id in Config.ADMINS:
+        return True
+    user_key = f"{action}:user:{user_id}"
+    if not await _user_limits[action].allow(user_key):
+        return False
+    if chat_id is not None and chat_id != user_id and not await _chat_limit.allow(f"chat:{chat_id}"):
+        await _user_limits[action].refund(user_key)
+        return False
+    return True
+
+def _bot_username() -> str:
+    """Username of the running bot, for /search@botname in groups"""
+    return bot.bot_username or Config.BOT_USERNAME or ""
+
+def _is_search_command(message) -> bool:
+    """Whether a message is /search, the command filter has not parsed it at this point"""
+    text = message.text or ""
+    if not text.startswith("/"):
+        return False
+    command, _, mention = text.split(maxsplit=1)[0][1:].partition("@")
+    return command.lower() == "search" and (not mention or mention.lower() == _bot_username().lower())
+
+def _is_file_callback(data: str) -> bool:
+    """File buttons carry f_<short_id> or, on older messages, file_<file_id>"""
+    return data.startswith(("f_", "file_"))
+
+@bot.on_message(filters.all, group=MIDDLEWARE_GROUP)
+async def message_gate(client, message):
+    """Drop messages from banned users and rate limit /search"""
+    user = message.from_user
+    if user is None:
+        # Channel posts are indexed, they are never gated
+        return
+
+    if await db.is_user_banned(user.id):
+        message.stop_propagation()
+
+    if _is_search_command(message) and not await _allowed("search", user.id, message.chat.id):
+        logger.info(f"⏳ Rate limited /search from {user.id} in {message.chat.id}")
+        message.stop_propagation()
+
+@bot.on_callback_query(filters.all, group=MIDDLEWARE_GROUP)
+async def callback_gate(client, callback_query):
+    """Drop button taps from banned users and rate limit file deliveries"""
+    user = callback_query.from_user
+    if await db.is_user_banned(user.id):
+        await callback_query.answer("🚫 You are banned from using this bot.", show_alert=True)
+        callback_query.stop_propagation()
+
+    chat_id = callback_query.message.chat.id if callback_query.message else None
+    if _is_file_callback(callback_query.data or "") and not await _allowed("file", user.id, chat_id):
+        logger.info(f"⏳ Rate limited file request from {user.id}")
+        await callback_query.answer("⏳ Too many requests, please wait a moment.", show_alert=True)
+        callback_query.stop_propagation()
+
+@bot.on_inline_query(filters.all, group=MIDDLEWARE_GROUP)
+async def inline_gate(client, inline_query):
+    """Drop inline queries from banned users and rate limit the rest"""
+    user = inline_query.from_user
+    if await db.is_user_banned(user.id):
+        inline_query.stop_propagation()
+
+    if inline_query.query.strip() and not await _allowed("inline", user.id):
+        await inline_query.answer(
+            results=[],
+            cache_time=0,
+            is_personal=True,
+            switch_pm_text="⏳ Too many searches, slow down a little",
+            switch_pm_parameter="start"
+        )
+        inline_query.stop_propagation()
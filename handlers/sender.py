@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from pyrogram.errors import FloodWait
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower is sent first
+PRIORITY_DELIVERY = 0
+PRIORITY_REPLY = 1
+PRIORITY_LOG = 2
+
+PRIORITY_NAMES = {PRIORITY_DELIVERY: "delivery", PRIORITY_REPLY: "reply", PRIORITY_LOG: "log"}
+
+class _Job:
+    """One queued API call"""
+
+    __slots__ = ("priority", "seq", "chat_id", "send", "retries", "future")
+
+    def __init__(self, priority: int, seq: int, chat_id: int, send: Callable[[], Awaitable[Any]], retries: int):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.send = send
+        self.retries = retries
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class OutboundScheduler:
+    """Central queue for outgoing Telegram calls
+
+    Calls are sent highest priority first within a global budget of
+    global_rate per second, each chat gets at most chat_rate per second,
+    and a FloodWait parks only the chat it was raised for while every
+    other chat keeps being served.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, max_queue: int, max_flood_wait: int):
+        """Initialize an idle scheduler"""
+        self.global_interval = 1 / global_rate if global_rate > 0 else 0.0
+        self.chat_interval = 1 / chat_rate if chat_rate > 0 else 0.0
+        self.max_queue = max_queue
+        self.max_flood_wait = max_flood_wait
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.flood_waits = 0
+        self.peak_depth = 0
+
+        self._seq = itertools.count()
+        # chat_id -> pending jobs of that chat, best first
+        self._chat_jobs: Dict[int, List[_Job]] = {}
+        # (priority, seq, chat_id) of chats whose next job may be sent now
+        self._ready: List[Tuple[int, int, int]] = []
+        # (wake time, chat_id) of chats waiting out their budget or a FloodWait
+        self._parked: List[Tuple[float, int]] = []
+        # Chats that are in _ready, _parked or sending, so each chat has one slot at a time
+        self._scheduled: set = set()
+        self._busy: set = set()
+        self._next_global = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # In-flight sends, referenced so they are not garbage collected mid-call
+        self._sending: set = set()
+
+    @property
+    def depth(self) -> int:
+        """Jobs waiting to be sent"""
+        return sum(len(jobs) for jobs in self._chat_jobs.values())
+
+    def start(self):
+        """Start the dispatcher"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatcher, failing whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._sending):
+            task.cancel()
+        for jobs in self._chat_jobs.values():
+            for job in jobs:
+                if not job.future.done():
+                    job.future.cancel()
+        self._chat_jobs.clear()
+
+    def submit(self, chat_id: int, send: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_REPLY, retries: int = 0) -> asyncio.Future:
+        """Queue a call for a chat and return a future for its result (priority is one of PRIORITY_*)
+
+        ``send`` is called with no arguments when the call's turn comes and
+        may be called again after a FloodWait or, up to ``retries`` times,
+        after another error. Log posts are dropped (result None) when the
+        queue is full.
+        """
+        if self._task is None:
+            self.start()
+        if self.depth >= self.max_queue and priority >= PRIORITY_LOG:
+            self.dropped += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(None)
+            return future
+
+        job = _Job(priority, next(self._seq), chat_id, send, retries)
+        heapq.heappush(self._chat_jobs.setdefault(chat_id, []), job)
+        self.peak_depth = max(self.peak_depth, self.depth)
+        if chat_id not in self._scheduled and chat_id not in self._busy:
+            self._make_ready(chat_id)
+        elif chat_id in self._scheduled and chat_id not in self._busy:
+            # A more urgent job may now head a chat that is already waiting in _ready
+            self._refresh_ready(chat_id)
+        self._wakeup.set()
+        return job.future
+
+    def _make_ready(self, chat_id: int):
+        """Put a chat with pending jobs in the ready heap"""
+        head = self._chat_jobs[chat_id][0]
+        heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+        self._scheduled.add(chat_id)
+
+    def _refresh_ready(self, chat_id: int):
+        """Re-key a chat in the ready heap after its head job changed"""
+        for i, (_, _, ready_chat) in enumerate(self._ready):
+            if ready_chat == chat_id:
+                head = self._chat_jobs[chat_id][0]
+                self._ready[i] = (head.priority, head.seq, chat_id)
+                heapq.heapify(self._ready)
+                return
+
+    def _park(self, chat_id: int, until: float):
+        """Hold a chat until a moment, if it still has jobs"""
+        if self._chat_jobs.get(chat_id):
+            heapq.heappush(self._parked, (until, chat_id))
+            self._scheduled.add(chat_id)
+        else:
+            self._chat_jobs.pop(chat_id, None)
+
+    async def _run(self):
+        """Dispatch jobs while respecting the global and per-chat budgets"""
+        while True:
+            now = time.monotonic()
+            while self._parked and self._parked[0][0] <= now:
+                _, chat_id = heapq.heappop(self._parked)
+                self._scheduled.discard(chat_id)
+                if self._chat_jobs.get(chat_id):
+                    self._make_ready(chat_id)
+
+            if not self._ready:
+                timeout = self._parked[0][0] - now if self._parked else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if self._next_global > now:
+                await asyncio.sleep(self._next_global - now)
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            self._scheduled.discard(chat_id)
+            job = heapq.heappop(self._chat_jobs[chat_id])
+            self._busy.add(chat_id)
+            self._next_global = time.monotonic() + self.global_interval
+            task = asyncio.create_task(self._send(job))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, job: _Job):
+        """Run one job and decide when its chat may send again"""
+        chat_id = job.chat_id
+        hold = self.chat_interval
+        try:
+            result = await job.send()
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        except FloodWait as e:
+            self.flood_waits += 1
+            wait = int(e.value or 1)
+            if wait > self.max_flood_wait:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                # Retry after the wait, only this chat is held back
+                logger.warning(f"⏳ FloodWait of {wait}s for chat {chat_id}, parking it")
+                heapq.heappush(self._chat_jobs.setdefault(chat_id, []), job)
+                hold = max(hold, wait)
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.cancel()
+            raise
+        except Exception as e:
+            if job.retries > 0:
+                job.retries -= 1
+                heapq.heappush(self._chat_jobs.setdefault(chat_id, []), job)
+                hold = max(hold, 1.0)
+            else:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+        finally:
+            self._busy.discard(chat_id)
+            self._park(chat_id, time.monotonic() + hold)
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per priority class and send counters"""
+        by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+        for jobs in self._chat_jobs.values():
+            for job in jobs:
+                by_priority[PRIORITY_NAMES[job.priority]] += 1
+        return {
+            "depth": sum(by_priority.values()),
+            "peak_depth": self.peak_depth,
+            "by_priority": by_priority,
+            "parked_chats": len(self._parked),
+            "sending": len(self._busy),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flood_waits": self.flood_waits
+        }
@@ -1,6 +1,7 @@
+import hashlib
 import logging
 import re
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 
 logger = logging.getLogger(__name__)
@@ -47,10 +48,12 @@ def get_media_info(message: Message) -> Optional[Dict[str, Any]]:
     
     media_info = {
         "file_id": None,
+        "file_unique_id": None,
         "file_name": "",
         "file_size": 0,
         "mime_type": "",
-        "file_type": "unknown"
+        "file_type": "unknown",
+        "duration": 0
     }
     
     # Handle different media types
@@ -70,15 +73,17 @@ def get_media_info(message: Message) -> Optional[Dict[str, Any]]:
         media = message.video_note
         media_info["file_type"] = "video_note"
     elif message.photo:
-        # Get the largest photo size
-        media = sorted(message.photo, key=lambda p: p.file_size, reverse=True)[0]
+        # Pyrogram exposes the largest size of a photo as a single Photo
+        media = message.photo
         media_info["file_type"] = "photo"
     else:
         return None
     
     # Extract file info
     media_info["file_id"] = media.file_id
+    media_info["file_unique_id"] = media.file_unique_id
     media_info["file_size"] = media.file_size
+    media_info["duration"] = getattr(media, "duration", 0) or 0
     media_info["mime_type"] = getattr(media, "mime_type", "")
     
     # Get file name if available
@@ -119,3 +124,191 @@ def create_pagination_buttons(page: int, total_pages: int, prefix: str) -> Inlin
     keyboard.append([InlineKeyboardButton("❌ Close", callback_data="close_pagination")])
     
     return InlineKeyboardMarkup(keyboard)
+
+_BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+def encode_short_id(number: int) -> str:
+    """Encode a positive counter value as a base62 short id"""
+    digits = []
+    while True:
+        number, remainder = divmod(number, 62)
+        digits.append(_BASE62[remainder])
+        if not number:
+            break
+    return "".join(reversed(digits))
+
+def file_callback_data(file: Dict) -> str:
+    """Callback data for a file button, the short id keeps it under Telegram's 64 bytes"""
+    if file.get("short_id"):
+        return f"f_{file['short_id']}"
+    return f"file_{file['file_id']}"
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse punctuation, dots and underscores into single spaces"""
+    if not text:
+        return ""
+    
+    return ' '.join(re.sub(r'[\W_]+', ' ', text.lower()).split())
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized search tokens"""
+    return normalize_text(text).split()
+
+# Release name vocabulary, mapped to the normalized value stored on the file
+_RESOLUTIONS = {"2160p": "2160p", "4k": "2160p", "uhd": "2160p", "1440p": "1440p", "1080p": "1080p",
+                "1080i": "1080p", "720p": "720p", "576p": "576p", "480p": "480p", "360p": "360p"}
+_CODECS = {"x265": "x265", "h265": "x265", "hevc": "x265", "x264": "x264", "h264": "x264",
+           "avc": "x264", "xvid": "xvid", "divx": "divx", "av1": "av1", "vp9": "vp9"}
+_SOURCES = {"bluray": "bluray", "blu ray": "bluray", "brrip": "bluray", "bdrip": "bluray", "remux": "bluray",
+            "web dl": "web-dl", "webdl": "web-dl", "webrip": "webrip", "web": "web-dl", "hdrip": "hdrip",
+            "dvdrip": "dvdrip", "dvdscr": "dvdrip", "dvd": "dvdrip", "hdtv": "hdtv", "pdtv": "hdtv",
+            "hdcam": "cam", "camrip": "cam", "cam": "cam", "hdts": "telesync", "telesync": "telesync",
+            "ts": "telesync", "predvd": "cam"}
+_LANGUAGES = {"hindi", "english", "tamil", "telugu", "malayalam", "kannada", "bengali", "marathi",
+              "punjabi", "gujarati", "urdu", "korean", "japanese", "chinese", "spanish", "french",
+              "german", "italian", "russian", "arabic", "turkish"}
+_EXTENSIONS = {"mkv", "mp4", "avi", "mov", "wmv", "flv", "webm", "m4v", "mpg", "mpeg", "ts",
+               "srt", "zip", "rar", "7z", "mp3", "m4a", "flac"}
+
+_YEAR_RE = re.compile(r'^(19[0-9]{2}|20[0-9]{2})$')
+_EPISODE_RE = re.compile(r'^s(\d{1,2})(?:e(\d{1,3}))?$|^(\d{1,2})x(\d{1,3})$')
+
+def parse_release_name(file_name: str) -> Dict[str, Any]:
+    """Parse a release file name into normalized tokens and metadata fields"""
+    name = file_name or ""
+    stem, _, extension = name.rpartition('.')
+    if stem and extension.lower() in _EXTENSIONS:
+        name = stem
+    
+    tokens = tokenize(name)
+    parsed: Dict[str, Any] = {
+        "tokens": list(dict.fromkeys(tokens)),
+        "title": "",
+        "year": None,
+        "resolution": None,
+        "codec": None,
+        "source": None,
+        "languages": [],
+        "season": None,
+        "episode": None
+    }
+    
+    # The title runs up to the year or the first token that looks like release metadata
+    title_end = None
+    years = []
+    for i, token in enumerate(tokens):
+        pair = f"{token} {tokens[i + 1]}" if i + 1 < len(tokens) else ""
+        marker = True
+        
+        if _YEAR_RE.match(token) and i > 0:
+            # Numbers like 1984 or 2049 can be part of the title, decided below
+            years.append(i)
+            marker = False
+        elif token in _RESOLUTIONS:
+            parsed["resolution"] = parsed["resolution"] or _RESOLUTIONS[token]
+        elif token in _CODECS:
+            parsed["codec"] = parsed["codec"] or _CODECS[token]
+        elif pair in _SOURCES:
+            parsed["source"] = parsed["source"] or _SOURCES[pair]
+        elif token in _SOURCES and i > 0:
+            parsed["source"] = parsed["source"] or _SOURCES[token]
+        elif token in _LANGUAGES:
+            if token not in parsed["languages"]:
+                parsed["languages"].append(token)
+        elif _EPISODE_RE.match(token):
+            match = _EPISODE_RE.match(token)
+            season, episode = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+            parsed["season"] = int(season)
+            parsed["episode"] = int(episode) if episode else None
+        else:
+            marker = False
+        
+        if marker and title_end is None:
+            title_end = i
+    
+    # The release year is the last year-like token before the markers (Wonder.Woman.1984.2020)
+    if years:
+        before = [i for i in years if title_end is None or i < title_end]
+        year_at = before[-1] if before else years[0]
+        parsed["year"] = int(tokens[year_at])
+        if before:
+            title_end = year_at
+    
+    parsed["title"] = " ".join(tokens[:title_end]) or " ".join(tokens)
+    return parsed
+
+_SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3, "tb": 1024 ** 4}
+_SIZE_FILTER_RE = re.compile(r'^size(>=|<=|>|<|:)(\d+(?:\.\d+)?)(b|kb|mb|gb|tb)?$', re.IGNORECASE)
+_FIELD_FILTER_RE = re.compile(r'^(year|res|resolution|type|codec|source|lang|language|season|episode):(\S+)$', re.IGNORECASE)
+_SIZE_OPERATORS = {">": "$gt", ">=": "$gte", "<": "$lt", "<=": "$lte"}
+_FILTER_FIELDS = {"res": "resolution", "type": "file_type", "lang": "languages", "language": "languages"}
+
+def parse_search_query(query: str, detect_qualifiers: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """Split a search query into free text and structured filters
+    
+    Understands explicit filters (year:2019, res:1080p, type:video, lang:hindi,
+    size>1gb) and, unless detect_qualifiers is False, detects bare qualifiers
+    such as 1080p, x265, S01E02 or a year. Detected qualifiers are a guess, so
+    callers retry with them left in the text when the filtered search is empty.
+    """
+    filters: Dict[str, Any] = {}
+    words = []
+    
+    for word in (query or "").split():
+        size = _SIZE_FILTER_RE.match(word)
+        field = _FIELD_FILTER_RE.match(word)
+        if size:
+            operator, amount, unit = size.groups()
+            value = int(float(amount) * _SIZE_UNITS[(unit or "mb").lower()])
+            if operator == ":":
+                filters["file_size"] = {"$gte": value}
+            else:
+                filters.setdefault("file_size", {})[_SIZE_OPERATORS[operator]] = value
+        elif field:
+            name, value = field.group(1).lower(), field.group(2).lower()
+            name = _FILTER_FIELDS.get(name, name)
+            if name in ("year", "season", "episode"):
+                if value.isdigit():
+                    filters[name] = int(value)
+            elif name == "resolution":
+                filters[name] = _RESOLUTIONS.get(value, value)
+            elif name == "codec":
+                filters[name] = _CODECS.get(value, value)
+            elif name == "source":
+                filters[name] = _SOURCES.get(value, value)
+            else:
+                filters[name] = value
+        else:
+            words.append(word)
+    
+    if not detect_qualifiers:
+        return " ".join(words), filters
+    
+    # Detect unambiguous qualifiers typed as plain words
+    text = []
+    for word in words:
+        token = normalize_text(word)
+        episode = _EPISODE_RE.match(token)
+        if token in _RESOLUTIONS and "resolution" not in filters:
+            filters["resolution"] = _RESOLUTIONS[token]
+        elif token in _CODECS and "codec" not in filters:
+            filters["codec"] = _CODECS[token]
+        elif episode and "season" not in filters:
+            season, number = (episode.group(1), episode.group(2)) if episode.group(1) else (episode.group(3), episode.group(4))
+            filters["season"] = int(season)
+            if number:
+                filters["episode"] = int(number)
+        else:
+            text.append(word)
+    
+    # A year only counts as a qualifier when there is a title next to it
+    if "year" not in filters and len(text) > 1 and _YEAR_RE.match(normalize_text(text[-1])):
+        filters["year"] = int(normalize_text(text.pop()))
+    
+    return " ".join(text), filters
+
+def file_fingerprint(file_name: str, file_size: int, duration: int = 0) -> str:
+    """Content fingerprint of a file: normalized release name, size and duration"""
+    tokens = parse_release_name(file_name)["tokens"]
+    key = f"{' '.join(tokens)}|{file_size or 0}|{duration or 0}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()